@@ -1,30 +1,66 @@
 import gradio as gr
 import sys
 import os
+import argparse
+import hashlib
+import multiprocessing
 from pathlib import Path
 import time
+import threading
 from typing import Dict, Any
 
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 from src.document_loader import DocumentLoader
-from src.langgraph_workflow import LangGraphCodeAssistant
+from src.langgraph_workflow import LangGraphCodeAssistant, RunCancelled
+from src.code_generator import CodeGenerator
+from src.admission import AdmissionController, AdmissionCancelled, AdmissionRejected
+from src.snapshot import SharedSnapshot, write_snapshot, context_hash
+from src.shared_cache import SQLiteCache
+from src.single_flight import SingleFlight
+from src.models import CodeSolution
+from src.metrics import metrics
 from src.config import config
 
 class GradioApp:
-    def __init__(self):
-        self.assistant = None
+    def __init__(self, generator_factory=CodeGenerator):
+        # The factory builds the LLM-backed generators; load tests pass a stub
+        self.generator_factory = generator_factory
+        # One assistant per model, shared by all requests. Per-request
+        # settings are passed into each run instead of being set on it.
+        self.assistants = {}
+        self._assistants_lock = threading.Lock()
         self.context_loaded = False
         self.context = None
-        self.current_model = None
+        self.context_hash = None
+        # Finished answers are shared between worker processes when configured
+        self.answer_cache = SQLiteCache(config.shared_cache_path, namespace="answers") if config.shared_cache_path else None
+        self.admission = AdmissionController(
+            max_concurrent=config.max_concurrent_requests,
+            max_per_user=config.max_requests_per_user,
+            max_queue_depth=config.max_queue_depth,
+            queue_timeout=config.queue_timeout,
+        )
+        # Identical questions asked while one is being answered share its run
+        self.flights = SingleFlight()
     
     def load_context(self):
         """Fetch the LangChain documentation to use as context for code generation."""
         try:
             print("Loading context...")
-            loader = DocumentLoader()
-            self.context = loader.load_lcel_docs()
+            snapshot_path = config.context_snapshot_path
+            if snapshot_path and os.path.exists(snapshot_path):
+                # Another process already crawled the docs; map its snapshot
+                print(f"Using context snapshot: {snapshot_path}")
+                self.context = SharedSnapshot(snapshot_path)
+            else:
+                loader = DocumentLoader()
+                self.context = loader.load_lcel_docs()
+                if snapshot_path:
+                    write_snapshot(snapshot_path, {"context": self.context})
+                    self.context = SharedSnapshot(snapshot_path)
+            self.context_hash = context_hash(self.context)
             self.context_loaded = True
             print(f"Context loaded successfully! Length: {len(self.context)}")
             return f"✅ Ready! Loaded {len(self.context)} characters of LCEL documentation"
@@ -38,7 +74,12 @@ class GradioApp:
         """Initialize the code generation assistant with the loaded context."""
         if self.context_loaded:
             try:
-                self.assistant = LangGraphCodeAssistant(self.context)
+                with self._assistants_lock:
+                    self.assistants = {
+                        config.default_model: LangGraphCodeAssistant(
+                            self.context, model=config.default_model, generator_factory=self.generator_factory
+                        )
+                    }
                 return "✅ Assistant ready! You can now ask questions about LCEL"
             except Exception as e:
                 return f"❌ Failed to create assistant: {str(e)}"
@@ -51,96 +92,228 @@ class GradioApp:
         else:
             return "❌ Please load context first"
     
+    def get_assistant(self, model):
+        """Return the shared assistant for a model, creating it on first use."""
+        with self._assistants_lock:
+            assistant = self.assistants.get(model)
+            if assistant is None:
+                print(f"Creating assistant with model: {model}")
+                assistant = LangGraphCodeAssistant(
+                    self.context, model=model, generator_factory=self.generator_factory
+                )
+                self.assistants[model] = assistant
+            return assistant
+    
+    @staticmethod
+    def user_id(request):
+        """
+        Identify the caller for the per-user concurrency cap.
+        
+        The address comes last: behind a proxy or a shared NAT every visitor
+        has the same one, which would put them all under a single cap.
+        """
+        if request is None:
+            return "anonymous"
+        if getattr(request, "username", None):
+            return request.username
+        if getattr(request, "session_hash", None):
+            return request.session_hash
+        if getattr(request, "client", None) and request.client.host:
+            return request.client.host
+        return "anonymous"
+    
+    def answer_key(self, question, model, max_iterations):
+        """Cache key for a finished answer."""
+        raw = f"{model}\n{max_iterations}\n{self.context_hash}\n{question}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    def flight_key(self, question, model, max_iterations):
+        """Requests with equal keys are answered by a single workflow run."""
+        normalized = " ".join(question.split()).casefold()
+        return (normalized, model, max_iterations, self.context_hash)
+    
+    def run_workflow(self, question, model, max_iterations, request=None, flight=None):
+        """
+        Answer from the shared cache, or run the workflow once a slot is free.
+        
+        With a flight, the run publishes its progress there and stops early
+        once every request waiting on it has gone away.
+        """
+        key = self.answer_key(question, model, max_iterations)
+        if self.answer_cache is not None:
+            cached = self.answer_cache.get(key)
+            if cached is not None:
+                print("Answer served from shared cache")
+                metrics.inc("answer_cache_hits_total")
+                cached["generation"] = CodeSolution(**cached["generation"])
+                cached["messages"] = [tuple(m) for m in cached["messages"]]
+                return cached
+        
+        assistant = self.get_assistant(model)
+        
+        # Everyone waiting for this run may already have left
+        cancel_event = flight.cancelled if flight else None
+        if cancel_event is not None and cancel_event.is_set():
+            raise RunCancelled("Run cancelled before it started")
+        
+        # Wait for a free slot; overloaded servers reject straight away
+        with self.admission.slot(self.user_id(request), cancel_event):
+            print(f"Generating solution with model: {model}, max_iterations: {max_iterations}")
+            result = assistant.generate_solution(
+                question,
+                max_iterations=max_iterations,
+                on_event=flight.publish if flight else None,
+                cancel_event=cancel_event,
+            )
+        
+        # Only successful runs are cached so Retry can still produce a new answer
+        if self.answer_cache is not None and result.get("error") == "no":
+            self.answer_cache.set(key, {
+                "generation": result["generation"].model_dump(),
+                "messages": [list(m) for m in result["messages"]],
+                "iterations": result["iterations"],
+                "error": result["error"],
+            })
+        return result
+    
     def clear_results(self):
         """Reset all output fields to empty state."""
         return "", "", "", "", ""
     
-    def generate_solution(self, question, model, max_iterations):
-        """Process the user's question and generate a code solution using the selected model."""
+    @staticmethod
+    def progress_status(event, model):
+        """Status line for a progress event of a running workflow."""
+        step = {
+            "generate": f"generated a solution with {event['model']}",
+            "check_code": "checks passed" if event["error"] == "no" else "checks failed",
+            "reflect": "reflecting on the errors",
+            "fix_imports": "fixing imports",
+        }.get(event["node"], event["node"])
+        return f"⏳ Working | Model: {model} | Iteration {event['iteration']}: {step}"
+    
+    def format_result(self, result, model, shared=False):
+        """Turn a workflow result into the values of the output fields."""
+        if not result.get("generation"):
+            return "No solution generated.", "", "", "", ""
+        
+        solution = result["generation"]
+        
+        # Extract the solution components
+        description = solution.prefix
+        imports = solution.imports
+        code = solution.code
+        
+        # Check if there were any validation errors during generation
+        error_info = ""
+        if result.get("error") != "no":
+            # Look through the conversation for error details
+            messages = result.get("messages", [])
+            error_messages = []
+            
+            for role, content in messages:
+                if role == "user" and ("failed" in content.lower() or "error" in content.lower()):
+                    error_messages.append(content)
+            
+            if error_messages:
+                error_info = "\n".join(error_messages[-2:])  # Show the most recent errors
+            else:
+                error_info = "Code validation failed - check imports and execution"
+        else:
+            error_info = "✅ No errors detected"
+        
+        # Build the status message with generation details
+        status = f"✅ Success" if result.get("error") == "no" else "❌ Failed"
+        iterations = result.get("iterations", 0)
+        status += f" | Model: {model} | Iterations: {iterations}"
+        if result.get("solved_by") and result["solved_by"] != model:
+            status += f" | Solved by: {result['solved_by']}"
+        if result.get("llm_calls_saved"):
+            status += f" | Stopped early, saved {result['llm_calls_saved']} LLM calls"
+        if shared:
+            status += " | Shared with an identical question already in progress"
+        
+        print(f"Generation complete: {status}")
+        return status, description, imports, code, error_info
+    
+    def stream_solution(self, question, model, max_iterations, request: gr.Request = None):
+        """
+        Generate a solution, yielding the output fields as the workflow progresses.
+        
+        Identical questions already being answered are joined rather than
+        run again, so every asker sees the same progress and the same answer.
+        Closing the stream (e.g. the browser tab) leaves the run; it is
+        cancelled when nobody is left waiting for it.
+        """
         if not question:
-            return "Please enter a question first.", "", "", "", ""
+            yield "Please enter a question first.", "", "", "", ""
+            return
         
         if not self.context_loaded:
-            return "Please load context first.", "", "", "", ""
+            yield "Please load context first.", "", "", "", ""
+            return
         
         try:
-            # Set up the assistant with the chosen model
-            if not self.assistant or self.current_model != model:
-                print(f"Creating assistant with model: {model}")
-                self.assistant = LangGraphCodeAssistant(self.context, model=model)
-                self.current_model = model
-            
-            # Configure the iteration limit for self-correction
-            self.assistant.max_iterations = max_iterations
-            print(f"Generating solution with model: {model}, max_iterations: {max_iterations}")
-            
-            # Run the code generation workflow
-            result = self.assistant.generate_solution(question)
+            max_iterations = int(max_iterations)
+            key = self.flight_key(question, model, max_iterations)
             
-            if not result.get("generation"):
-                return "No solution generated.", "", "", "", ""
+            def run(flight):
+                return self.run_workflow(question, model, max_iterations, request, flight)
             
-            solution = result["generation"]
+            with self.flights.join(key, run) as (flight, leader):
+                if not leader:
+                    print("Joined an identical question already in progress")
+                    yield "⏳ Joined an identical question already in progress", "", "", "", ""
+                for event in flight.events():
+                    yield self.progress_status(event, model), "", "", "", ""
+                result = flight.result()
             
-            # Extract the solution components
-            description = solution.prefix
-            imports = solution.imports
-            code = solution.code
-            
-            # Check if there were any validation errors during generation
-            error_info = ""
-            if result.get("error") != "no":
-                # Look through the conversation for error details
-                messages = result.get("messages", [])
-                error_messages = []
-                
-                for role, content in messages:
-                    if role == "user" and ("failed" in content.lower() or "error" in content.lower()):
-                        error_messages.append(content)
-                
-                if error_messages:
-                    error_info = "\n".join(error_messages[-2:])  # Show the most recent errors
-                else:
-                    error_info = "Code validation failed - check imports and execution"
-            else:
-                error_info = "✅ No errors detected"
-            
-            # Build the status message with generation details
-            status = f"✅ Success" if result.get("error") == "no" else "❌ Failed"
-            iterations = result.get("iterations", 0)
-            status += f" | Model: {self.current_model} | Iterations: {iterations}"
-            
-            print(f"Generation complete: {status}")
-            return status, description, imports, code, error_info
+            yield self.format_result(result, model, shared=not leader)
             
+        except AdmissionRejected as e:
+            print(f"Request rejected: {e}")
+            yield f"⏳ {e}", "", "", "", ""
+        except (AdmissionCancelled, RunCancelled) as e:
+            print(f"Request cancelled: {e}")
+            yield f"⏹ {e}", "", "", "", ""
         except Exception as e:
             print(f"Error in generate_solution: {str(e)}")
             import traceback
             traceback.print_exc()
-            return f"❌ Error: {str(e)}", "", "", "", str(e)
+            yield f"❌ Error: {str(e)}", "", "", "", str(e)
+    
+    def generate_solution(self, question, model, max_iterations, request: gr.Request = None):
+        """Process the user's question and return the final output fields."""
+        outputs = None
+        for outputs in self.stream_solution(question, model, max_iterations, request):
+            pass
+        return outputs
+
+# Gradio 6 moved theme and CSS from gr.Blocks to launch()/mount_gradio_app()
+STYLE_ON_MOUNT = int(gr.__version__.split(".")[0]) >= 6
 
-def create_interface():
+CSS = """
+.gradio-container {
+    max-width: 1200px !important;
+}
+.code-output {
+    font-family: 'Courier New', monospace;
+}
+.gr-textbox {
+    min-height: 60px !important;
+}
+.gr-textbox textarea {
+    min-height: 50px !important;
+    line-height: 1.4 !important;
+}
+"""
+
+def create_interface(app=None):
     """Build the Gradio web interface with all the necessary components."""
-    app = GradioApp()
+    app = app or GradioApp()
     
     with gr.Blocks(
         title="LangGraph Code Assistant",
-        theme=gr.themes.Soft(),
-        css="""
-        .gradio-container {
-            max-width: 1200px !important;
-        }
-        .code-output {
-            font-family: 'Courier New', monospace;
-        }
-        .gr-textbox {
-            min-height: 60px !important;
-        }
-        .gr-textbox textarea {
-            min-height: 50px !important;
-            line-height: 1.4 !important;
-        }
-        """
+        **({} if STYLE_ON_MOUNT else {"theme": gr.themes.Soft(), "css": CSS})
     ) as interface:
         
         gr.Markdown("# 🤖 LangGraph Code Assistant")
@@ -155,7 +328,7 @@ def create_interface():
                 
                 
                 model_dropdown = gr.Dropdown(
-                    choices=["gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo"],
+                    choices=["gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo", "cascade"],
                     value="gpt-4o-mini",
                     label="Model"
                 )
@@ -230,9 +403,10 @@ def create_interface():
         
         # Wire up all the button clicks and interactions
         generate_btn.click(
-            app.generate_solution,
+            app.stream_solution,
             inputs=[question_input, model_dropdown, max_iterations],
-            outputs=[status_output, description_output, imports_output, code_output, error_output]
+            outputs=[status_output, description_output, imports_output, code_output, error_output],
+            api_name="generate_solution"
         )
         
         # Retry clears results first, then generates again
@@ -240,7 +414,7 @@ def create_interface():
             app.clear_results,
             outputs=[status_output, description_output, imports_output, code_output, error_output]
         ).then(
-            app.generate_solution,
+            app.stream_solution,
             inputs=[question_input, model_dropdown, max_iterations],
             outputs=[status_output, description_output, imports_output, code_output, error_output]
         )
@@ -294,13 +468,87 @@ def create_interface():
             outputs=status_display
         )
     
+    # Let Gradio hand requests straight to the admission controller, which
+    # does the fair queueing and rejects when overloaded. One worker more
+    # than the controller admits makes overflow reach it and be rejected
+    # there; Gradio's own queue is bounded so nothing waits unseen behind it.
+    admission_capacity = config.max_concurrent_requests + config.max_queue_depth
+    interface.queue(
+        default_concurrency_limit=admission_capacity + 1,
+        max_size=admission_capacity,
+    )
+    
     return interface
 
+def create_app(gradio_app=None):
+    """Build the ASGI app serving the Gradio UI and a Prometheus /metrics endpoint."""
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+    
+    app = FastAPI()
+    
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def metrics_endpoint():
+        return metrics.render_prometheus()
+    
+    style = {"theme": gr.themes.Soft(), "css": CSS} if STYLE_ON_MOUNT else {}
+    return gr.mount_gradio_app(app, create_interface(gradio_app), path="/", show_error=True, **style)
+
+def serve(server_name, port):
+    """Run a single web server process."""
+    import uvicorn
+    
+    # Trust X-Forwarded-For only from the configured proxies
+    uvicorn.run(create_app(), host=server_name, port=port,
+                proxy_headers=True, forwarded_allow_ips=config.forwarded_allow_ips)
+
+def run_workers(workers, server_name, port):
+    """
+    Crawl the docs once, then start one server process per worker.
+    
+    The docs are written to a memory-mapped snapshot that every worker maps
+    read-only, and answers and check results go to a shared SQLite cache, so
+    per-worker memory does not grow with the number of workers. Worker i
+    listens on port + i; put a load balancer with sticky sessions in front.
+    """
+    cache_dir = project_root / ".cache"
+    snapshot_path = config.context_snapshot_path or str(cache_dir / "context.snapshot")
+    cache_path = config.shared_cache_path or str(cache_dir / "shared_cache.sqlite")
+    
+    print(f"Writing shared context snapshot: {snapshot_path}")
+    write_snapshot(snapshot_path, {"context": DocumentLoader().load_lcel_docs()})
+    
+    # Spawned workers build their own config from these variables
+    os.environ["CONTEXT_SNAPSHOT_PATH"] = snapshot_path
+    os.environ["SHARED_CACHE_PATH"] = cache_path
+    
+    if os.getenv("RENDER") is not None:
+        print(f"⚠️ Only port {port} is routed on Render; workers 1-{workers - 1} will get no traffic")
+    
+    mp = multiprocessing.get_context("spawn")
+    processes = [
+        mp.Process(target=serve, args=(server_name, port + i), name=f"worker-{i}")
+        for i in range(workers)
+    ]
+    for i, process in enumerate(processes):
+        process.start()
+        print(f"Started {process.name} on port {port + i} (pid {process.pid})")
+    
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
 def main():
     """Start up the web application and launch the interface."""
-    print("🚀 Starting LangGraph Code Assistant - Gradio UI...")
+    parser = argparse.ArgumentParser(description="LangGraph Code Assistant - Gradio UI")
+    parser.add_argument("--workers", type=int, default=config.workers,
+                       help="Number of server processes sharing one context snapshot")
+    args = parser.parse_args()
     
-    interface = create_interface()
+    print("🚀 Starting LangGraph Code Assistant - Gradio UI...")
     
     # Get port from environment variable (for Render.com) or use default
     port = int(os.getenv("PORT", 7860))
@@ -308,12 +556,10 @@ def main():
     # Use localhost for local development, 0.0.0.0 for production
     server_name = "localhost" if os.getenv("RENDER") is None else "0.0.0.0"
     
-    interface.launch(
-        server_name=server_name,
-        server_port=port,
-        share=False,
-        show_error=True
-    )
+    if args.workers > 1:
+        run_workers(args.workers, server_name, port)
+    else:
+        serve(server_name, port)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,428 @@
+"""
+Concurrent-user load test for the Gradio app.
+
+Drives GradioApp.generate_solution in-process, or the HTTP endpoint of a
+running server, with N simulated users against a stub LLM of configurable
+latency. Each concurrency level reports throughput, latency percentiles,
+queueing delay and RSS/CPU of the app and its execution-check processes as
+JSON, so runs can be diffed. An untimed warm-up request runs first.
+
+    # In-process sweep
+    python load_test.py run --levels 1,2,4,8,16 --llm-latency 0.5 --output results.json
+
+    # HTTP: start a stub server, then drive it
+    python load_test.py serve --llm-latency 0.5 --port 7861
+    python load_test.py run --url http://localhost:7861 --server-pid <pid>
+
+Over HTTP each simulated user has its own client and therefore its own
+session, so the per-user cap applies to it as it would to a browser tab.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional
+
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+# The stub never calls OpenAI, but config requires a key to be present
+os.environ.setdefault("OPENAI_API_KEY", "load-test")
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from app_gradio import GradioApp, create_app
+from src.code_generator import CodeGenerator
+from src.metrics import metrics
+from src.config import config
+
+STUB_CONTEXT = "Stub LCEL documentation used for load testing."
+STUB_SOLUTION = {
+    "prefix": "Stub solution for load testing.",
+    "imports": "import json",
+    "code": "result = json.dumps({'ok': True})",
+}
+
+
+class SleepingChatModel(BaseChatModel):
+    """Chat model that sleeps instead of calling OpenAI and answers with a passing solution."""
+
+    latency: float = 0.5
+    jitter: float = 0.0
+    tool_name: str = "CodeSolution"
+
+    @property
+    def _llm_type(self) -> str:
+        return "load-test-sleeping-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        # The solution schema is the only tool; answers are always a call to it
+        return self.model_copy(update={"tool_name": convert_to_openai_tool(tools[0])["function"]["name"]})
+
+    def _sleep(self):
+        time.sleep(max(self.latency + random.uniform(-self.jitter, self.jitter), 0))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._sleep()
+        message = AIMessage(content="", tool_calls=[{"name": self.tool_name, "args": STUB_SOLUTION, "id": "stub"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._sleep()
+        chunk = AIMessageChunk(content="", tool_call_chunks=[
+            {"name": self.tool_name, "args": json.dumps(STUB_SOLUTION), "id": "stub", "index": 0}
+        ])
+        yield ChatGenerationChunk(message=chunk)
+
+
+class StubCodeGenerator(CodeGenerator):
+    """CodeGenerator backed by SleepingChatModel; the rest is the real generator."""
+
+    latency = 0.5
+    jitter = 0.0
+
+    def __init__(self, model: str = None, temperature: float = 0):
+        llm = SleepingChatModel(latency=self.latency, jitter=self.jitter)
+        super().__init__(model=model, temperature=temperature, llm=llm)
+
+
+class StubGradioApp(GradioApp):
+    """GradioApp wired to the stub generator, with stub docs instead of a crawl."""
+
+    def __init__(self):
+        super().__init__(generator_factory=StubCodeGenerator)
+        self.load_context()
+        self.create_assistant()
+
+    def load_context(self):
+        self.context = STUB_CONTEXT
+        self.context_hash = "stub"
+        self.context_loaded = True
+        return f"✅ Ready! Loaded {len(self.context)} characters of stub documentation"
+
+
+class ProcessSampler:
+    """
+    Samples RSS and CPU time of a process and its descendants from /proc.
+
+    Execution checks run in processes forked from the sandbox server, a
+    child of the app, so CPU time covers the whole process tree: live
+    descendants directly, finished ones through their parent's totals of
+    reaped children. RSS is reported for the process itself and, summed,
+    for its descendants; the sum counts pages shared after fork repeatedly.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_children_rss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _stat_fields(pid: int) -> Optional[List[str]]:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # Fields after the command name, which may contain spaces
+                return f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            return None
+
+    def descendants(self) -> List[int]:
+        children: Dict[int, List[int]] = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                fields = self._stat_fields(int(entry))
+                if fields:
+                    # ppid is field 4 of /proc/<pid>/stat
+                    children.setdefault(int(fields[1]), []).append(int(entry))
+        found, pending = [], list(children.get(self.pid, []))
+        while pending:
+            pid = pending.pop()
+            found.append(pid)
+            pending.extend(children.get(pid, []))
+        return found
+
+    @staticmethod
+    def rss_bytes(pid: int) -> Optional[int]:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            return None
+        return None
+
+    def cpu_seconds(self) -> Optional[float]:
+        if self._stat_fields(self.pid) is None:
+            return None
+        total = 0
+        for pid in [self.pid] + self.descendants():
+            fields = self._stat_fields(pid)
+            if fields:
+                # utime, stime, cutime and cstime are fields 14 to 17 of /proc/<pid>/stat
+                total += sum(int(value) for value in fields[11:15])
+        return total / os.sysconf("SC_CLK_TCK")
+
+    def __enter__(self):
+        self.start_rss = self.rss_bytes(self.pid)
+        self.start_cpu = self.cpu_seconds()
+        self.start_time = time.monotonic()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.end_rss = self.rss_bytes(self.pid)
+        end_cpu = self.cpu_seconds()
+        elapsed = time.monotonic() - self.start_time
+        self.cpu_percent = None
+        if self.start_cpu is not None and end_cpu is not None and elapsed > 0:
+            self.cpu_percent = 100 * (end_cpu - self.start_cpu) / elapsed
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, self.rss_bytes(self.pid) or 0)
+            children_rss = sum(self.rss_bytes(pid) or 0 for pid in self.descendants())
+            self.peak_children_rss = max(self.peak_children_rss, children_rss)
+            self._stop.wait(self.interval)
+
+    def report(self) -> Dict[str, Any]:
+        def mb(value):
+            return round(value / 2**20, 1) if value else None
+        return {
+            "rss_mb": {"start": mb(self.start_rss), "peak": mb(self.peak_rss), "end": mb(self.end_rss)},
+            "children_rss_mb": {"peak": mb(self.peak_children_rss)},
+            "cpu_percent": round(self.cpu_percent, 1) if self.cpu_percent is not None else None,
+        }
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def queue_wait_totals(prometheus_text: str) -> tuple[float, float]:
+    """Read the admission wait histogram sum and count from /metrics output."""
+    def value(name):
+        match = re.search(rf"^{name} ([0-9.eE+-]+)$", prometheus_text, re.MULTILINE)
+        return float(match.group(1)) if match else 0.0
+    return value("admission_wait_seconds_sum"), value("admission_wait_seconds_count")
+
+
+class InProcessTarget:
+    """Calls GradioApp.generate_solution directly from simulated user threads."""
+
+    def __init__(self, model: str, max_iterations: int):
+        self.app = StubGradioApp()
+        self.model = model
+        self.max_iterations = max_iterations
+        self.pid = os.getpid()
+
+    def prepare(self, users: List[str]):
+        pass
+
+    def call(self, user: str, question: str) -> str:
+        request = SimpleNamespace(username=user, client=None, session_hash=None)
+        status, *_ = self.app.generate_solution(question, self.model, self.max_iterations, request)
+        return status
+
+    def metrics_text(self) -> str:
+        return metrics.render_prometheus()
+
+
+class HTTPTarget:
+    """Calls the generate_solution endpoint of a running server through gradio_client."""
+
+    def __init__(self, url: str, model: str, max_iterations: int, server_pid: Optional[int]):
+        from gradio_client import Client
+
+        self.url = url.rstrip("/")
+        self.model = model
+        self.max_iterations = max_iterations
+        self.pid = server_pid
+        self._client_cls = Client
+        self._clients = {}
+
+    def prepare(self, users: List[str]):
+        # Connecting fetches the app config, so it is kept out of the timings
+        for user in users:
+            if user not in self._clients:
+                self._clients[user] = self._client_cls(self.url, verbose=False)
+
+    def call(self, user: str, question: str) -> str:
+        status, *_ = self._clients[user].predict(question, self.model, self.max_iterations, api_name="/generate_solution")
+        return status
+
+    def metrics_text(self) -> str:
+        import httpx
+
+        return httpx.get(f"{self.url}/metrics", timeout=10).text
+
+
+def run_level(target, concurrency: int, requests_per_user: int) -> Dict[str, Any]:
+    """Run one concurrency level and summarize it."""
+    latencies, outcomes = [], {"completed": 0, "rejected": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def simulated_user(user_index: int):
+        user = users[user_index]
+        for i in range(requests_per_user):
+            question = f"Load test question {concurrency}-{user_index}-{i}: build a RAG chain in LCEL"
+            started = time.monotonic()
+            try:
+                status = target.call(user, question)
+                outcome = "rejected" if status.startswith("⏳") else (
+                    "completed" if status.startswith("✅") else "errors"
+                )
+            except Exception as e:
+                # Gradio rejects bursts beyond its bounded queue before they reach admission
+                if "Queue is full" in str(e):
+                    outcome = "rejected"
+                else:
+                    print(f"{user} request failed: {e}")
+                    outcome = "errors"
+            elapsed = time.monotonic() - started
+            with lock:
+                outcomes[outcome] += 1
+                if outcome == "completed":
+                    latencies.append(elapsed)
+
+    users = [f"user-{i}" for i in range(concurrency)]
+    target.prepare(users)
+
+    wait_sum_before, wait_count_before = queue_wait_totals(target.metrics_text())
+    sampler = ProcessSampler(target.pid) if target.pid else None
+    started = time.monotonic()
+    with sampler or nullcontext():
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(simulated_user, range(concurrency)))
+    duration = time.monotonic() - started
+    wait_sum_after, wait_count_after = queue_wait_totals(target.metrics_text())
+
+    waits = wait_count_after - wait_count_before
+    result = {
+        "concurrency": concurrency,
+        "requests": concurrency * requests_per_user,
+        **outcomes,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(outcomes["completed"] / duration, 3) if duration else None,
+        "latency_s": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": sum(latencies) / len(latencies) if latencies else None,
+            "max": max(latencies) if latencies else None,
+        },
+        "queue_wait_s": {
+            "mean": (wait_sum_after - wait_sum_before) / waits if waits else None,
+        },
+    }
+    if sampler:
+        result.update(sampler.report())
+    return result
+
+
+def run(args):
+    StubCodeGenerator.latency = args.llm_latency
+    StubCodeGenerator.jitter = args.llm_jitter
+    if args.url:
+        target = HTTPTarget(args.url, args.model, args.max_iterations, args.server_pid)
+    else:
+        target = InProcessTarget(args.model, args.max_iterations)
+
+    # One untimed request first, so the first level does not pay for
+    # starting the execution sandbox and other one-off setup
+    print("Warming up...")
+    target.prepare(["warm-up"])
+    target.call("warm-up", "Warm-up question: build a RAG chain in LCEL")
+
+    levels = []
+    for concurrency in [int(level) for level in args.levels.split(",")]:
+        print(f"Running concurrency level {concurrency}...")
+        level = run_level(target, concurrency, args.requests_per_user)
+        levels.append(level)
+        p95 = level["latency_s"]["p95"]
+        print(f"  {level['throughput_rps']} req/s | p95 {p95 if p95 is None else round(p95, 3)}s"
+              f" | rejected {level['rejected']} | errors {level['errors']}")
+
+    report = {
+        "target": args.url or "in-process",
+        "settings": {
+            "llm_latency_s": args.llm_latency,
+            "llm_jitter_s": args.llm_jitter,
+            "requests_per_user": args.requests_per_user,
+            "model": args.model,
+            "max_iterations": args.max_iterations,
+            "max_concurrent_requests": config.max_concurrent_requests,
+            "max_requests_per_user": config.max_requests_per_user,
+            "max_queue_depth": config.max_queue_depth,
+        },
+        "levels": levels,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+        print(f"Results written to {args.output}")
+    else:
+        print(output)
+
+
+def serve(args):
+    import uvicorn
+
+    StubCodeGenerator.latency = args.llm_latency
+    StubCodeGenerator.jitter = args.llm_jitter
+    print(f"Serving stub app on port {args.port} (pid {os.getpid()})")
+    uvicorn.run(create_app(StubGradioApp()), host="localhost", port=args.port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the LangGraph Code Assistant web app")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Sweep concurrency levels and report results")
+    run_parser.add_argument("--levels", default="1,2,4,8,16",
+                           help="Comma-separated numbers of simulated users")
+    run_parser.add_argument("--requests-per-user", type=int, default=5,
+                           help="Requests each simulated user sends per level")
+    run_parser.add_argument("--url", help="Drive a running server instead of an in-process app")
+    run_parser.add_argument("--server-pid", type=int, help="PID of the server for RSS/CPU sampling")
+    run_parser.add_argument("--model", default=config.default_model, help="Model name sent with each request")
+    run_parser.add_argument("--max-iterations", type=int, default=config.max_iterations,
+                           help="Iteration limit sent with each request")
+    run_parser.add_argument("--output", help="Write the JSON report to this file")
+
+    serve_parser = subparsers.add_parser("serve", help="Run the web app against the stub LLM")
+    serve_parser.add_argument("--port", type=int, default=7861, help="Port to listen on")
+
+    for sub in (run_parser, serve_parser):
+        sub.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per stub LLM call")
+        sub.add_argument("--llm-jitter", type=float, default=0.0, help="Random +/- seconds per stub LLM call")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        serve(args)
+
+
+if __name__ == "__main__":
+    main()
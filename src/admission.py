@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Optional
+from .metrics import metrics
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted to the workflow."""
+
+    def __init__(self, message: str, queue_position: Optional[int] = None):
+        super().__init__(message)
+        self.queue_position = queue_position
+
+
+class AdmissionCancelled(Exception):
+    """Raised when a request's cancel event is set while it waits for a slot."""
+
+
+# How often a waiting request checks its cancel event
+_CANCEL_POLL_SECONDS = 0.25
+
+
+class _Ticket:
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Bounded fair queue in front of the LLM workflow.
+
+    At most max_concurrent requests run at once, and at most max_per_user of
+    them belong to the same user. Waiting requests are served round-robin
+    across users, so one user submitting many questions cannot starve the
+    others. When more than max_queue_depth requests are waiting, new ones
+    are rejected immediately instead of piling up.
+    """
+
+    def __init__(self, max_concurrent: int, max_per_user: int,
+                 max_queue_depth: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue_depth = max_queue_depth
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._active = 0
+        self._active_per_user = {}
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self._queued = 0
+
+    @contextmanager
+    def slot(self, user_id: str, cancel_event: Optional[threading.Event] = None):
+        """
+        Hold an execution slot for the duration of the with-block.
+
+        Args:
+            user_id: Identifier used for the per-user concurrency cap
+            cancel_event: When set while waiting, the request leaves the queue
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait timed out
+            AdmissionCancelled: If cancel_event was set before a slot was free
+        """
+        self._acquire(user_id, cancel_event)
+        try:
+            yield
+        finally:
+            self._release(user_id)
+
+    def queue_depth(self) -> int:
+        """Number of requests currently waiting for a slot."""
+        with self._cond:
+            return self._queued
+
+    def _acquire(self, user_id: str, cancel_event: Optional[threading.Event] = None):
+        ticket = _Ticket(user_id)
+        with self._cond:
+            self._waiting.setdefault(user_id, deque()).append(ticket)
+            self._queued += 1
+            self._dispatch()
+
+            if not ticket.granted and self._queued > self.max_queue_depth:
+                position = self._position(ticket)
+                self._remove(ticket)
+                metrics.inc("admission_rejected_total", reason="queue_full")
+                raise AdmissionRejected(
+                    f"Server busy: {self._queued} requests are already waiting "
+                    f"(you would be #{position} in line). Please try again shortly.",
+                    queue_position=position,
+                )
+
+            deadline = ticket.enqueued_at + self.queue_timeout
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    position = self._position(ticket)
+                    self._remove(ticket)
+                    metrics.inc("admission_rejected_total", reason="timeout")
+                    raise AdmissionRejected(
+                        f"Timed out after {self.queue_timeout:.0f}s waiting in queue (position {position}).",
+                        queue_position=position,
+                    )
+                if cancel_event is not None:
+                    if cancel_event.is_set():
+                        self._remove(ticket)
+                        metrics.inc("admission_cancelled_total")
+                        raise AdmissionCancelled("Request cancelled while waiting in queue")
+                    remaining = min(remaining, _CANCEL_POLL_SECONDS)
+                self._cond.wait(remaining)
+
+        metrics.observe("admission_wait_seconds", time.monotonic() - ticket.enqueued_at)
+
+    def _release(self, user_id: str):
+        with self._cond:
+            self._active -= 1
+            self._active_per_user[user_id] -= 1
+            if self._active_per_user[user_id] == 0:
+                del self._active_per_user[user_id]
+            self._dispatch()
+            self._cond.notify_all()
+
+    def _dispatch(self):
+        """Grant free slots to waiting tickets, round-robin across users."""
+        granted = True
+        while granted and self._active < self.max_concurrent:
+            granted = False
+            for user_id in list(self._waiting):
+                if self._active >= self.max_concurrent:
+                    break
+                if self._active_per_user.get(user_id, 0) >= self.max_per_user:
+                    continue
+                ticket = self._waiting[user_id].popleft()
+                if not self._waiting[user_id]:
+                    del self._waiting[user_id]
+                else:
+                    # Move this user behind everyone else for the next round
+                    self._waiting.move_to_end(user_id)
+                ticket.granted = True
+                self._queued -= 1
+                self._active += 1
+                self._active_per_user[user_id] = self._active_per_user.get(user_id, 0) + 1
+                granted = True
+        self._publish_gauges()
+        self._cond.notify_all()
+
+    def _position(self, ticket: _Ticket) -> int:
+        """Approximate 1-based position of a ticket in the round-robin order."""
+        index = self._waiting[ticket.user_id].index(ticket)
+        ahead = sum(
+            min(len(queue), index + 1) if user_id != ticket.user_id else index
+            for user_id, queue in self._waiting.items()
+        )
+        return ahead + 1
+
+    def _remove(self, ticket: _Ticket):
+        queue = self._waiting[ticket.user_id]
+        queue.remove(ticket)
+        if not queue:
+            del self._waiting[ticket.user_id]
+        self._queued -= 1
+        self._publish_gauges()
+
+    def _publish_gauges(self):
+        metrics.set_gauge("admission_queue_depth", self._queued)
+        metrics.set_gauge("admission_inflight", self._active)
@@ -0,0 +1,144 @@
+import random
+import threading
+from typing import Dict, Iterable, List, Optional
+from .shared_cache import SQLiteCache
+from .metrics import metrics
+from .config import config
+
+# Model name that selects the configured cascade instead of a single model
+CASCADE = "cascade"
+
+
+class ModelCascade:
+    """
+    Escalation policy for a list of models ordered from cheapest to strongest.
+
+    Each question starts on the first tier and moves to the next one when
+    the current tier keeps failing. Besides the fixed rules, the policy
+    learns from past runs: if retrying on a tier after a given error type
+    rarely recovers, the next such failure escalates straight away. A small
+    share of those failures is still retried, so the statistics keep up when
+    a model gets better.
+    """
+
+    def __init__(self, models: List[str], escalate_after: int = 1,
+                 escalate_on: Iterable[str] = (), stats: Optional[SQLiteCache] = None,
+                 min_samples: int = 5, min_recovery_rate: float = 0.2, explore_rate: float = 0.1):
+        """
+        Args:
+            models: Model names, cheapest first
+            escalate_after: Failures on a tier before moving to the next one
+            escalate_on: Error types that escalate on their first occurrence
+            stats: Shared cache for learned statistics (in-memory if None)
+            min_samples: Retries observed before learned statistics are used
+            min_recovery_rate: Escalate when retries recover less often than this
+            explore_rate: Share of learned escalations that retry on the tier anyway
+        """
+        if not models:
+            raise ValueError("A model cascade needs at least one model")
+        self.models = list(models)
+        self.escalate_after = escalate_after
+        self.escalate_on = set(escalate_on)
+        self.stats = stats
+        self.min_samples = min_samples
+        self.min_recovery_rate = min_recovery_rate
+        self.explore_rate = explore_rate
+        self._local_stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "ModelCascade":
+        """
+        Build the cascade described by the CASCADE_* settings.
+
+        Learned statistics are kept in SQLite, so they survive assistants
+        being recreated and server restarts, and are shared by workers.
+        """
+        stats_path = config.shared_cache_path or config.cascade_stats_path
+        stats = SQLiteCache(stats_path, namespace="cascade") if stats_path else None
+        return cls(
+            models=config.cascade_models,
+            escalate_after=config.cascade_escalate_after,
+            escalate_on=config.cascade_escalate_on,
+            stats=stats,
+            explore_rate=config.cascade_explore_rate,
+        )
+
+    def next_tier(self, tier: int, failures_at_tier: int, error_type: str, no_progress: bool) -> int:
+        """
+        Decide which tier the next attempt should use.
+
+        Args:
+            tier: Tier of the attempt that just failed
+            failures_at_tier: Failures so far on this tier, including this one
+            error_type: Classified error of this failure
+            no_progress: Whether the failure repeated an earlier one
+
+        Returns:
+            Tier index for the next attempt
+        """
+        if tier >= len(self.models) - 1:
+            return tier
+        escalate = no_progress or error_type in self.escalate_on or failures_at_tier >= self.escalate_after
+        if not escalate and self._retry_rarely_recovers(self.models[tier], error_type):
+            # Retrying now and then is the only way a learned escalation
+            # gets new samples and can be unlearned
+            escalate = random.random() >= self.explore_rate
+            if not escalate:
+                metrics.inc("cascade_explorations_total", model=self.models[tier])
+        if escalate:
+            metrics.inc("cascade_escalations_total", from_model=self.models[tier], to_model=self.models[tier + 1])
+            return tier + 1
+        return tier
+
+    def record_outcome(self, attempts: List[List], solved: bool):
+        """
+        Learn from a finished run.
+
+        Every failure that was retried on the same tier counts as one sample
+        for that (model, error type); it recovered if a later attempt on that
+        tier passed.
+
+        Args:
+            attempts: [tier, error_type] per attempt, error_type "" on success
+            solved: Whether the run ended with passing code
+        """
+        for i, (tier, error_type) in enumerate(attempts):
+            if not error_type:
+                continue
+            later = [a for a in attempts[i + 1:] if a[0] == tier]
+            if not later:
+                continue
+            recovered = any(not later_error for _, later_error in later)
+            self._update_stats(self.models[tier], error_type, recovered)
+
+        if solved:
+            metrics.inc("cascade_solved_total", model=self.models[attempts[-1][0]])
+        else:
+            metrics.inc("cascade_unsolved_total")
+
+    def _stats_key(self, model: str, error_type: str) -> str:
+        return f"{model}:{error_type}"
+
+    def _get_stats(self, key: str) -> Dict[str, int]:
+        if self.stats is not None:
+            return self.stats.get(key) or {"retries": 0, "recovered": 0}
+        return dict(self._local_stats.get(key, {"retries": 0, "recovered": 0}))
+
+    def _update_stats(self, model: str, error_type: str, recovered: bool):
+        key = self._stats_key(model, error_type)
+        if self.stats is not None:
+            # One statement, so workers updating the same key do not lose counts
+            self.stats.increment(key, {"retries": 1, "recovered": int(recovered)})
+            return
+        with self._lock:
+            stats = self._get_stats(key)
+            stats["retries"] += 1
+            stats["recovered"] += int(recovered)
+            self._local_stats[key] = stats
+
+    def _retry_rarely_recovers(self, model: str, error_type: str) -> bool:
+        stats = self._get_stats(self._stats_key(model, error_type))
+        if stats["retries"] < self.min_samples:
+            return False
+        return stats["recovered"] / stats["retries"] < self.min_recovery_rate
@@ -1,36 +1,61 @@
 import os
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
-from langchain_core.tracers import LangChainTracer
-from langsmith import Client
 from typing import Dict, Any
-from .models import CodeSolution
+from .models import CodeSolution, CodeFirstSolution
+from .incremental_json import IncrementalJSONParser
+from .metrics import metrics
+from .shared_cache import SQLiteCache
+from .llm_cache import LLMCache
+from .sandbox import get_sandbox
 from .config import config
 
 
+# Failure classes reported by classify_error
+SYNTAX_ERROR = "syntax"
+MISSING_MODULE = "missing_module"
+RUNTIME_ERROR = "runtime"
+TIMEOUT = "timeout"
+
+
+def classify_error(error_message: str) -> str:
+    """
+    Classify a check failure from its "ExceptionType: message" string.
+
+    Args:
+        error_message: Error string returned by check_imports or check_execution
+
+    Returns:
+        One of SYNTAX_ERROR, MISSING_MODULE, TIMEOUT or RUNTIME_ERROR
+    """
+    error_type = error_message.split(":", 1)[0].strip()
+    if error_type in ("SyntaxError", "IndentationError", "TabError"):
+        return SYNTAX_ERROR
+    if error_type in ("ModuleNotFoundError", "ImportError"):
+        return MISSING_MODULE
+    if "Timeout" in error_type:
+        return TIMEOUT
+    return RUNTIME_ERROR
+
+
 class CodeGenerator:
     
-    def __init__(self, model: str = None, temperature: float = 0):
+    def __init__(self, model: str = None, temperature: float = 0, llm=None,
+                 llm_cache: LLMCache = None):
         self.model = model or config.default_model
         self.temperature = temperature
-        self.llm = ChatOpenAI(temperature=temperature, model=self.model)
-        self._setup_tracing()
+        # Any chat model supporting structured output can be injected, e.g. a fake in tests
+        if llm is None:
+            # Replay runs offline: the client is built but never called
+            api_key = {} if config.openai_api_key else {"api_key": "offline-replay"}
+            llm = ChatOpenAI(temperature=temperature, model=self.model, **api_key)
+        self.llm = llm
+        self.llm_cache = llm_cache or LLMCache.from_config()
         self._setup_prompt()
-    
-    def _setup_tracing(self):
-        self.tracer = None
-        if config.langchain_tracing_v2 and config.langchain_api_key:
-            try:
-                # Initialize LangSmith client
-                self.langsmith_client = Client(api_key=config.langchain_api_key)
-                # Set up tracer
-                self.tracer = LangChainTracer(project_name=config.langchain_project)
-                print(f"LangChain tracing initialized for project: {config.langchain_project}")
-            except Exception as e:
-                print(f"Failed to initialize LangChain tracing: {e}")
-                self.tracer = None
-        else:
-            print("LangChain tracing not configured")
+        self._setup_check_cache()
     
     def _setup_prompt(self):
         self.code_gen_prompt = ChatPromptTemplate.from_messages([
@@ -46,6 +71,36 @@ class CodeGenerator:
         ])
         
         self.code_gen_chain = self.code_gen_prompt | self.llm.with_structured_output(CodeSolution)
+        
+        # Streaming path: the raw tool call arguments are parsed as they arrive
+        self.code_stream_chain = None
+        if config.streaming_checks:
+            schema = CodeFirstSolution if config.code_first_output else CodeSolution
+            self.code_stream_chain = self.code_gen_prompt | self.llm.bind_tools(
+                [schema], tool_choice=schema.__name__
+            )
+    
+    def _setup_check_cache(self):
+        # Check results are shared between worker processes when configured
+        self.check_cache = None
+        if config.shared_cache_path:
+            self.check_cache = SQLiteCache(
+                config.shared_cache_path, namespace="checks",
+                max_age=config.check_cache_ttl, max_entries=config.check_cache_max_entries,
+            )
+    
+    def _cached_check(self, kind: str, source: str, check) -> tuple[bool, str]:
+        if self.check_cache is None:
+            return check()
+        key = f"{kind}:{hashlib.sha256(source.encode('utf-8')).hexdigest()}"
+        cached = self.check_cache.get(key)
+        if cached is not None:
+            return tuple(cached)
+        result = check()
+        # Timeouts may be transient, so only deterministic outcomes are cached
+        if classify_error(result[1]) != TIMEOUT:
+            self.check_cache.set(key, list(result))
+        return result
     
     def generate_code(self, context: str, messages: list) -> CodeSolution:
         """
@@ -58,17 +113,124 @@ class CodeGenerator:
         Returns:
             CodeSolution object with prefix, imports, and code
         """
-        # Use tracer if available
-        if self.tracer:
-            return self.code_gen_chain.invoke(
-                {"context": context, "messages": messages},
-                config={"callbacks": [self.tracer]}
-            )
-        else:
-            return self.code_gen_chain.invoke({
-                "context": context, 
-                "messages": messages
-            })
+        cache_key = self._llm_cache_key(context, messages, CodeSolution)
+        if cache_key:
+            cached = self.llm_cache.lookup(cache_key)
+            if cached is not None:
+                return CodeSolution(**cached)
+        
+        # Tracing callbacks are inherited from the workflow run
+        solution = self.code_gen_chain.invoke({
+            "context": context, 
+            "messages": messages
+        })
+        
+        if cache_key:
+            self.llm_cache.record(cache_key, solution.model_dump())
+        return solution
+    
+    def _llm_cache_key(self, context: str, messages: list, schema) -> str:
+        """Content address of this request in the LLM cache, or "" without a cache."""
+        if self.llm_cache is None:
+            return ""
+        prompt = self.code_gen_prompt.format_messages(context=context, messages=messages)
+        return self.llm_cache.key(self.model, self.temperature, schema.__name__, prompt)
+    
+    def generate_code_pipelined(self, context: str, messages: list) -> tuple[CodeSolution, dict]:
+        """
+        Generate a code solution while checking it as it streams in.
+        
+        The import check starts as soon as the imports field is complete and
+        the execution check as soon as the code field is, overlapping with
+        the rest of the response. A failed import check aborts the stream.
+        
+        Args:
+            context: The documentation context
+            messages: List of conversation messages
+            
+        Returns:
+            Tuple of (solution, checks), where checks maps "imports" and
+            "execution" to the (is_valid, error_message) of the checks that ran
+        """
+        if self.code_stream_chain is None:
+            return self.generate_code(context, messages), {}
+        
+        schema = CodeFirstSolution if config.code_first_output else CodeSolution
+        cache_key = self._llm_cache_key(context, messages, schema)
+        if cache_key:
+            cached = self.llm_cache.lookup(cache_key)
+            if cached is not None:
+                return CodeSolution(**cached), {}
+        
+        parser = IncrementalJSONParser()
+        futures = {}
+        aborted = parse_failed = False
+        
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            stream = self.code_stream_chain.stream({"context": context, "messages": messages})
+            try:
+                for chunk in stream:
+                    for tool_chunk in chunk.tool_call_chunks:
+                        if tool_chunk.get("index") not in (0, None) or not tool_chunk.get("args"):
+                            continue
+                        for name, value in parser.feed(tool_chunk["args"]):
+                            self._start_check(executor, futures, name, parser.fields)
+                    imports_check = futures.get("imports")
+                    if imports_check and imports_check.done() and not imports_check.result()[0]:
+                        print("Import check failed while streaming, aborting generation")
+                        aborted = True
+                        break
+            except ValueError as e:
+                # Malformed or non-object tool arguments
+                print(f"Could not parse the streamed solution ({e}), falling back to a regular call")
+                parse_failed = True
+            finally:
+                stream.close()
+            stream_end = time.monotonic()
+            
+            checks = {name: future.result() for name, future in futures.items()}
+        
+        if parse_failed:
+            metrics.inc("streaming_parse_errors_total")
+            return self.generate_code(context, messages), {}
+        if aborted:
+            metrics.inc("streaming_generation_aborted_total")
+        elif not parser.done:
+            # The model answered without the tool call; use the regular path
+            return self.generate_code(context, messages), {}
+        
+        # Time the checks ran concurrently with the rest of the response
+        for future in futures.values():
+            metrics.observe("check_overlap_seconds", max(stream_end - future.started_at, 0))
+        
+        fields = parser.fields
+        solution = CodeSolution(
+            prefix=fields.get("prefix", ""),
+            imports=fields.get("imports", ""),
+            code=fields.get("code", ""),
+        )
+        # Aborted responses are incomplete and are not recorded
+        if cache_key and not aborted:
+            self.llm_cache.record(cache_key, solution.model_dump())
+        return solution, checks
+    
+    def _start_check(self, executor, futures: dict, name: str, fields: dict):
+        """Submit the check a newly completed field makes possible."""
+        if name == "imports":
+            future = executor.submit(self.check_imports, fields["imports"])
+            future.started_at = time.monotonic()
+            futures["imports"] = future
+        elif name == "code" and "imports" in fields:
+            imports_check = futures["imports"]
+            
+            def check_execution():
+                if not imports_check.result()[0]:
+                    return imports_check.result()
+                return self.check_execution(fields["imports"], fields["code"])
+            
+            future = executor.submit(check_execution)
+            future.started_at = time.monotonic()
+            futures["execution"] = future
     
     def check_imports(self, imports: str) -> tuple[bool, str]:
         """
@@ -78,13 +240,17 @@ class CodeGenerator:
             imports: Import statements to check
             
         Returns:
-            Tuple of (is_valid, error_message)
+            Tuple of (is_valid, error_message), where error_message starts
+            with the exception type name
         """
+        return self._cached_check("imports", imports, lambda: self._run_imports(imports))
+    
+    def _run_imports(self, imports: str) -> tuple[bool, str]:
         try:
             exec(imports)
             return True, ""
         except Exception as e:
-            return False, str(e)
+            return False, f"{type(e).__name__}: {e}"
     
     def check_execution(self, imports: str, code: str) -> tuple[bool, str]:
         """
@@ -95,10 +261,24 @@ class CodeGenerator:
             code: Code to execute
             
         Returns:
-            Tuple of (is_valid, error_message)
+            Tuple of (is_valid, error_message), where error_message starts
+            with the exception type name
         """
-        try:
-            exec(imports + "\n" + code)
-            return True, ""
-        except Exception as e:
-            return False, str(e)
\ No newline at end of file
+        source = imports + "\n" + code
+        if config.execution_check_mode != "offline":
+            # Live checks call the real API, so their outcome (a rate limit,
+            # a dropped connection) says nothing about the next run
+            return self._run_execution(source)
+        return self._cached_check("execution-offline", source, lambda: self._run_execution(source, True))
+    
+    def _run_execution(self, source: str, offline: bool = False) -> tuple[bool, str]:
+        # A child process, so a hanging solution is killed rather than left running
+        ok, error, calls = get_sandbox().run(source, offline, config.execution_timeout)
+        if error.startswith("TimeoutError"):
+            metrics.inc("execution_checks_killed_total")
+        if calls:
+            for call in calls:
+                metrics.inc("offline_calls_intercepted_total", kind=call["kind"])
+            targets = ", ".join(sorted({call["target"] for call in calls}))
+            print(f"Offline check intercepted {len(calls)} outgoing calls: {targets}")
+        return ok, error
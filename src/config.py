@@ -1,11 +1,15 @@
 import os
-from typing import Optional
+from typing import List, Optional
 from dotenv import load_dotenv
 
 # Read environment variables from .env file
 load_dotenv()
 
 
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
 class Config:
 
     def __init__(self):
@@ -16,18 +20,62 @@ class Config:
         self.default_model: str = os.getenv("DEFAULT_MODEL", "gpt-4o-mini")
         self.max_iterations: int = int(os.getenv("MAX_ITERATIONS", "3"))
         self.reflection_mode: str = os.getenv("REFLECTION_MODE", "do_not_reflect")
+        self.execution_timeout: float = float(os.getenv("EXECUTION_TIMEOUT", "30"))
+        # "live" runs generated code as-is; "offline" swaps LLM/HTTP clients for local fakes
+        self.execution_check_mode: str = os.getenv("EXECUTION_CHECK_MODE", "live").lower()
+        self.streaming_checks: bool = os.getenv("STREAMING_CHECKS", "false").lower() == "true"
+        self.code_first_output: bool = os.getenv("CODE_FIRST_OUTPUT", "false").lower() == "true"
+        
+        # Model cascade: cheapest model first, escalate on failure
+        self.cascade_models: List[str] = _split(os.getenv("CASCADE_MODELS", "gpt-4o-mini,gpt-4o"))
+        self.cascade_escalate_after: int = int(os.getenv("CASCADE_ESCALATE_AFTER", "2"))
+        self.cascade_escalate_on: List[str] = _split(os.getenv("CASCADE_ESCALATE_ON", ""))
+        # Learned escalation statistics; SHARED_CACHE_PATH takes precedence
+        self.cascade_stats_path: str = os.getenv("CASCADE_STATS_PATH", ".cache/cascade_stats.sqlite")
+        self.cascade_explore_rate: float = float(os.getenv("CASCADE_EXPLORE_RATE", "0.1"))
+        
+        # Admission control for the web app
+        self.max_concurrent_requests: int = int(os.getenv("MAX_CONCURRENT_REQUESTS", "4"))
+        self.max_requests_per_user: int = int(os.getenv("MAX_REQUESTS_PER_USER", "1"))
+        self.max_queue_depth: int = int(os.getenv("MAX_QUEUE_DEPTH", "16"))
+        self.queue_timeout: float = float(os.getenv("QUEUE_TIMEOUT", "120"))
+        # Proxies whose X-Forwarded-For header is trusted for client addresses
+        self.forwarded_allow_ips: str = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+        
+        # Multi-worker serving; worker i listens on PORT + i
+        self.workers: int = int(os.getenv("WORKERS", "1"))
+        self.context_snapshot_path: str = os.getenv("CONTEXT_SNAPSHOT_PATH", "")
+        self.shared_cache_path: str = os.getenv("SHARED_CACHE_PATH", "")
+        # Lifetime and size limit of cached code check results
+        self.check_cache_ttl: float = float(os.getenv("CHECK_CACHE_TTL", "86400"))
+        self.check_cache_max_entries: int = int(os.getenv("CHECK_CACHE_MAX_ENTRIES", "10000"))
+        
+        # LLM response cache: off, read_through, record or replay
+        self.llm_cache_mode: str = os.getenv("LLM_CACHE_MODE", "off").lower()
+        self.llm_cache_path: str = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+        
+        # Tracing pipeline (active when LANGCHAIN_TRACING_V2 is true)
+        self.trace_sample_rate: float = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+        self.trace_queue_size: int = int(os.getenv("TRACE_QUEUE_SIZE", "1000"))
+        self.trace_batch_size: int = int(os.getenv("TRACE_BATCH_SIZE", "50"))
+        self.trace_flush_interval: float = float(os.getenv("TRACE_FLUSH_INTERVAL", "2"))
+        self.trace_local_path: str = os.getenv("TRACE_LOCAL_PATH", ".cache/traces.jsonl")
         
         # Configure LangChain tracing if it is enabled
         self._setup_langchain_tracing()
         
-        # Check if we have the required API key
-        if not self.openai_api_key:
+        # Check if we have the required API key (replaying recorded responses needs none)
+        if not self.openai_api_key and self.llm_cache_mode != "replay":
             raise ValueError("OPENAI_API_KEY is required. Please set it in your .env file.")
     
     def _setup_langchain_tracing(self):
-        if self.langchain_tracing_v2 and self.langchain_api_key:
-            os.environ["LANGCHAIN_TRACING_V2"] = "true"
-            os.environ["LANGCHAIN_API_KEY"] = self.langchain_api_key
+        # Runs are traced by our own pipeline (src/tracing.py). LangChain's
+        # environment-driven tracer is switched off so nothing is traced twice.
+        os.environ["LANGCHAIN_TRACING_V2"] = "false"
+        os.environ["LANGSMITH_TRACING"] = "false"
+        if self.langchain_tracing_v2:
+            if self.langchain_api_key:
+                os.environ["LANGCHAIN_API_KEY"] = self.langchain_api_key
             os.environ["LANGCHAIN_PROJECT"] = self.langchain_project
             print(f"LangChain tracing enabled for project: {self.langchain_project}")
         else:
@@ -0,0 +1,223 @@
+import hashlib
+import re
+import xml.etree.ElementTree as ET
+from collections import deque
+from typing import Callable, List, Optional
+from urllib.parse import parse_qsl, urldefrag, urlencode, urljoin, urlsplit, urlunsplit
+import requests
+from bs4 import BeautifulSoup as Soup
+from langchain_core.documents import Document
+from .metrics import metrics
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_INDEX_PAGES = ("index.html", "index.htm")
+_SKIP_EXTENSIONS = (
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".pdf", ".zip",
+    ".gz", ".css", ".js", ".json", ".xml", ".txt", ".ipynb", ".mp4", ".woff", ".woff2",
+)
+
+
+def canonicalize_url(url: str, base: Optional[str] = None, keep_query: bool = False) -> str:
+    """
+    Normalize a URL so that variants of the same page compare equal.
+
+    Resolves it against base, lowercases the scheme and host, drops default
+    ports, fragments, "index.html" and trailing slashes, and drops the query
+    string unless keep_query is set (then tracking parameters are removed and
+    the rest sorted).
+
+    Args:
+        url: The URL or link to normalize
+        base: URL of the page the link was found on
+        keep_query: Whether the query string identifies distinct pages
+
+    Returns:
+        The canonical URL
+    """
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    for index_page in _INDEX_PAGES:
+        if path.endswith("/" + index_page):
+            path = path[:-len(index_page)]
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = ""
+    if keep_query:
+        params = [(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith("utm_")]
+        query = urlencode(sorted(params))
+
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class DocsCrawler:
+    """
+    Breadth-first documentation crawler that fetches and stores each page once.
+
+    Pages are tracked by canonical URL, so fragment, trailing-slash and
+    query-string variants of a page are fetched a single time, and by a hash
+    of their extracted text, so the same content served under different URLs
+    is only kept once. The crawl is seeded from the site's sitemap.xml when
+    one exists, which reaches deep pages without long link chains.
+    """
+
+    def __init__(self, max_depth: int = 2, link_regex: Optional[str] = None,
+                 prevent_outside: bool = True, use_sitemap: bool = True,
+                 max_pages: int = 500, timeout: float = 10,
+                 extractor: Optional[Callable[[str], str]] = None):
+        self.max_depth = max_depth
+        self.link_regex = re.compile(link_regex) if link_regex else None
+        self.prevent_outside = prevent_outside
+        self.use_sitemap = use_sitemap
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.extractor = extractor
+        self.session = requests.Session()
+
+    def crawl(self, url: str) -> List[Document]:
+        """
+        Crawl documentation starting at url.
+
+        Args:
+            url: The root URL; with prevent_outside only pages below it, or
+                below where it redirects to, are loaded
+
+        Returns:
+            One Document per distinct page, with the canonical URL as source
+        """
+        # Canonical URLs are only keys for "already seen"; pages are fetched
+        # at the URL they were found under, so slash-terminated pages do not
+        # cost a redirect each
+        root = canonicalize_url(url)
+        visited = {root}
+        content_hashes = set()
+        queue = deque([(url, 0)])
+        documents = []
+        fetched = duplicates = 0
+
+        while queue and len(documents) < self.max_pages:
+            page_url, depth = queue.popleft()
+            response = self._fetch(page_url)
+            if depth == 0:
+                if response is not None:
+                    # A moved docs section redirects its start page; crawl
+                    # below where it landed instead of the old prefix
+                    root = canonicalize_url(response.url)
+                    visited.add(root)
+                if self.use_sitemap:
+                    for seed in self._sitemap_urls(root):
+                        key = canonicalize_url(seed)
+                        if key not in visited and self._allowed(key, root):
+                            visited.add(key)
+                            queue.append((seed, 1))
+            if response is None:
+                continue
+            fetched += 1
+
+            # Redirects may leave the allowed area or land on a page already
+            # seen under another URL
+            final_url = canonicalize_url(response.url)
+            if depth > 0 and final_url != canonicalize_url(page_url):
+                if not self._allowed(final_url, root):
+                    continue
+                if final_url in visited:
+                    duplicates += 1
+                    continue
+                visited.add(final_url)
+
+            soup = Soup(response.text, "html.parser")
+            text = self.extractor(response.text) if self.extractor else soup.text
+            content_hash = hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+            if content_hash in content_hashes:
+                duplicates += 1
+                continue
+            content_hashes.add(content_hash)
+
+            title = soup.title.string.strip() if soup.title and soup.title.string else ""
+            documents.append(Document(page_content=text, metadata={"source": final_url, "title": title}))
+
+            if depth + 1 >= self.max_depth:
+                continue
+            # Links are relative to the URL actually served, not the canonical one
+            for link in soup.find_all("a", href=True):
+                link_url = urldefrag(urljoin(response.url, link["href"].strip())).url
+                key = canonicalize_url(link_url)
+                if key not in visited and self._allowed(key, root):
+                    visited.add(key)
+                    queue.append((link_url, depth + 1))
+
+        metrics.inc("crawler_pages_fetched_total", fetched)
+        metrics.inc("crawler_duplicates_skipped_total", duplicates)
+        print(f"Crawled {fetched} pages, kept {len(documents)}, skipped {duplicates} duplicates")
+        return documents
+
+    def _allowed(self, url: str, root: str) -> bool:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            return False
+        if parts.path.lower().endswith(_SKIP_EXTENSIONS):
+            return False
+        if self.prevent_outside and not (url == root or url.startswith(root.rstrip("/") + "/")):
+            return False
+        if self.link_regex and not self.link_regex.match(url):
+            return False
+        return True
+
+    def _fetch(self, url: str) -> Optional[requests.Response]:
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"Failed to fetch {url}: {e}")
+            return None
+        if response.status_code != 200 or "html" not in response.headers.get("Content-Type", "html"):
+            return None
+        return response
+
+    def _sitemap_urls(self, root: str, max_sitemaps: int = 20) -> List[str]:
+        """Page URLs listed in the site's sitemap(s)."""
+        parts = urlsplit(root)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        pending = [f"{origin}/sitemap.xml"]
+        try:
+            robots = self.session.get(f"{origin}/robots.txt", timeout=self.timeout)
+            if robots.status_code == 200:
+                pending += [
+                    line.split(":", 1)[1].strip()
+                    for line in robots.text.splitlines()
+                    if line.lower().startswith("sitemap:")
+                ]
+        except requests.RequestException:
+            pass
+
+        seen, urls = set(), []
+        while pending and len(seen) < max_sitemaps:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+            try:
+                response = self.session.get(sitemap_url, timeout=self.timeout)
+                if response.status_code != 200:
+                    continue
+                tree = ET.fromstring(response.content)
+            except (requests.RequestException, ET.ParseError):
+                continue
+            for element in tree.iter():
+                if not element.tag.endswith("loc") or not element.text:
+                    continue
+                if tree.tag.endswith("sitemapindex"):
+                    pending.append(element.text.strip())
+                else:
+                    urls.append(urldefrag(element.text.strip()).url)
+        if urls:
+            print(f"Found {len(urls)} URLs in sitemap")
+        return urls
@@ -1,13 +1,14 @@
-from bs4 import BeautifulSoup as Soup
-from langchain_community.document_loaders.recursive_url_loader import RecursiveUrlLoader
 from typing import List
 from langchain_core.documents import Document
+from .crawler import DocsCrawler
 
 
 class DocumentLoader:
     
-    def __init__(self, max_depth: int = 20):
+    def __init__(self, max_depth: int = 20, max_pages: int = 500, use_sitemap: bool = True):
         self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.use_sitemap = use_sitemap
     
     def load_lcel_docs(self, url: str = "https://python.langchain.com/docs/concepts/lcel/") -> str:
         """
@@ -18,22 +19,28 @@ class DocumentLoader:
             
         Returns:
             Concatenated content from all loaded documents
+
+        Raises:
+            ValueError: If no page could be loaded
         """
         print(f"Loading documentation from: {url}")
         print(f"Max depth: {self.max_depth}")
         
-        loader = RecursiveUrlLoader(
-            url=url, 
-            max_depth=2,  # Reduced depth to prevent infinite loops
-            use_async=False,
-            prevent_outside=True,  # Prevent loading external sites
+        # Pages are deduplicated by canonical URL and content, so the full
+        # depth can be crawled without refetching the same page
+        crawler = DocsCrawler(
+            max_depth=self.max_depth,
             link_regex=r".*docs/concepts/lcel.*",  # Only follow LCEL-related links
-            extractor=lambda x: Soup(x, "html.parser").text
+            prevent_outside=True,  # Prevent loading external sites
+            use_sitemap=self.use_sitemap,
+            max_pages=self.max_pages,
         )
         
         print("Starting document loading...")
-        docs = loader.load()
+        docs = crawler.crawl(url)
         print(f"Loaded {len(docs)} documents")
+        if not docs:
+            raise ValueError(f"No documentation could be loaded from {url}")
         
         # Sort the list based on the URLs and get the text
         d_sorted = sorted(docs, key=lambda x: x.metadata["source"])
@@ -57,14 +64,18 @@ class DocumentLoader:
         """
         all_docs = []
         
+        crawler = DocsCrawler(
+            max_depth=self.max_depth,
+            use_sitemap=self.use_sitemap,
+            max_pages=self.max_pages,
+        )
+        seen_sources = set()
         for url in urls:
-            loader = RecursiveUrlLoader(
-                url=url,
-                max_depth=self.max_depth,
-                extractor=lambda x: Soup(x, "html.parser").text
-            )
-            docs = loader.load()
-            all_docs.extend(docs)
+            for doc in crawler.crawl(url):
+                # Overlapping roots can reach the same page twice
+                if doc.metadata["source"] not in seen_sources:
+                    seen_sources.add(doc.metadata["source"])
+                    all_docs.append(doc)
         
         # Sort and concatenate
         d_sorted = sorted(all_docs, key=lambda x: x.metadata["source"])
@@ -0,0 +1,138 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+_WHITESPACE = " \t\r\n"
+
+
+class IncrementalJSONParser:
+    """
+    Parse a JSON object that arrives in chunks.
+
+    Each call to feed() returns the top-level fields whose values completed
+    within that chunk, so a consumer can act on early fields while later
+    ones are still streaming. Every character is examined once.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._state = "before_object"
+        self._raw: List[str] = []
+        self._key = None
+        self._escape = False
+        self._in_string = False
+        self._depth = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume the next piece of the JSON text.
+
+        Args:
+            chunk: Next piece of the JSON text
+
+        Returns:
+            (name, value) pairs for fields completed by this chunk
+        """
+        completed = []
+        for char in chunk:
+            if self.done:
+                break
+            field = self._step(char)
+            if field is not None:
+                completed.append(field)
+        return completed
+
+    def _step(self, char: str):
+        state = self._state
+
+        if state == "before_object":
+            if char == "{":
+                self._state = "expect_key"
+            elif char not in _WHITESPACE:
+                raise ValueError(f"Expected '{{' but got {char!r}")
+
+        elif state == "expect_key":
+            if char == '"':
+                self._raw = [char]
+                self._state = "in_key"
+            elif char == "}":
+                self.done = True
+            elif char not in _WHITESPACE + ",":
+                raise ValueError(f"Expected a key but got {char!r}")
+
+        elif state == "in_key":
+            self._raw.append(char)
+            if self._string_closed(char):
+                self._key = json.loads("".join(self._raw))
+                self._state = "expect_colon"
+
+        elif state == "expect_colon":
+            if char == ":":
+                self._state = "expect_value"
+            elif char not in _WHITESPACE:
+                raise ValueError(f"Expected ':' but got {char!r}")
+
+        elif state == "expect_value":
+            if char in _WHITESPACE:
+                return None
+            self._raw = [char]
+            if char == '"':
+                self._state = "in_string"
+            elif char in "{[":
+                self._depth = 1
+                self._in_string = False
+                self._state = "in_composite"
+            else:
+                self._state = "in_scalar"
+
+        elif state == "in_string":
+            self._raw.append(char)
+            if self._string_closed(char):
+                return self._complete()
+
+        elif state == "in_composite":
+            self._raw.append(char)
+            if self._in_string:
+                if self._string_closed(char):
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    return self._complete()
+
+        elif state == "in_scalar":
+            if char in _WHITESPACE + ",}":
+                field = self._complete()
+                self._step(char)
+                return field
+            self._raw.append(char)
+
+        elif state == "after_value":
+            if char == ",":
+                self._state = "expect_key"
+            elif char == "}":
+                self.done = True
+            elif char not in _WHITESPACE:
+                raise ValueError(f"Expected ',' or '}}' but got {char!r}")
+
+        return None
+
+    def _string_closed(self, char: str) -> bool:
+        if self._escape:
+            self._escape = False
+            return False
+        if char == "\\":
+            self._escape = True
+            return False
+        return char == '"' and len(self._raw) > 1
+
+    def _complete(self) -> Tuple[str, Any]:
+        value = json.loads("".join(self._raw))
+        self.fields[self._key] = value
+        self._raw = []
+        self._state = "after_value"
+        return self._key, value
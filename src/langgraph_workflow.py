@@ -1,16 +1,37 @@
-from typing import Dict, Any
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, Any, Optional, Union
 from langgraph.graph import END, StateGraph, START
-from langchain_core.tracers import LangChainTracer
 from .models import GraphState, CodeSolution
-from .code_generator import CodeGenerator
+from .code_generator import CodeGenerator, classify_error, MISSING_MODULE
+from .cascade import ModelCascade, CASCADE
+from .snapshot import SharedSnapshot, context_text
+from .metrics import metrics
+from .tracing import get_tracer
 from .config import config
 
 
+class RunCancelled(Exception):
+    """Raised when a run is cancelled between workflow steps."""
+
+
 class LangGraphCodeAssistant:
     
-    def __init__(self, context: str, model: str = None):
+    def __init__(self, context: Union[str, SharedSnapshot], model: str = None,
+                 cascade: Optional[ModelCascade] = None,
+                 generator_factory: Callable[..., CodeGenerator] = CodeGenerator):
+        # A SharedSnapshot keeps the docs in a memory-mapped file shared by
+        # all worker processes; it is only decoded while building a prompt
         self.context = context
-        self.code_generator = CodeGenerator(model=model)
+        
+        # With a cascade there is one generator per tier, cheapest first
+        if cascade is None and model == CASCADE:
+            cascade = ModelCascade.from_config()
+        self.cascade = cascade
+        models = cascade.models if cascade else [model]
+        self.generators = [generator_factory(model=m) for m in models]
+        self.code_generator = self.generators[0]
         self.max_iterations = config.max_iterations
         self.reflection_mode = config.reflection_mode
         self.workflow = self._build_workflow()
@@ -23,6 +44,7 @@ class LangGraphCodeAssistant:
         workflow.add_node("generate", self._generate)
         workflow.add_node("check_code", self._code_check)
         workflow.add_node("reflect", self._reflect)
+        workflow.add_node("fix_imports", self._fix_imports)
         
         # Build graph
         workflow.add_edge(START, "generate")
@@ -33,10 +55,12 @@ class LangGraphCodeAssistant:
             {
                 "end": END,
                 "reflect": "reflect",
+                "fix_imports": "fix_imports",
                 "generate": "generate",
             },
         )
         workflow.add_edge("reflect", "generate")
+        workflow.add_edge("fix_imports", "generate")
         
         return workflow.compile()
     
@@ -69,9 +93,18 @@ class LangGraphCodeAssistant:
                 )
             ]
 
-        print("Calling code generator...")
-        # Solution
-        code_solution = self.code_generator.generate_code(self.context, messages)
+        generator = self.generators[state.get("tier", 0)]
+        print(f"Calling code generator ({generator.model})...")
+        # Solution, checked while it streams in when pipelining is enabled
+        if config.streaming_checks:
+            code_solution, checks = generator.generate_code_pipelined(context_text(self.context), messages)
+        else:
+            code_solution, checks = generator.generate_code(context_text(self.context), messages), {}
+        if state.get("strategy") == "fix_imports":
+            # Only the new imports are taken; the code that failed on them stays as it was
+            previous = state["generation"]
+            code_solution = CodeSolution(prefix=previous.prefix, imports=code_solution.imports, code=previous.code)
+            checks = {name: result for name, result in checks.items() if name == "imports"}
         print(f"Generated solution: {code_solution.prefix[:100]}...")
         
         messages += [
@@ -84,7 +117,7 @@ class LangGraphCodeAssistant:
         # Increment
         iterations = iterations + 1
         print(f"Generation complete. Iteration: {iterations}")
-        return {"generation": code_solution, "messages": messages, "iterations": iterations}
+        return {"generation": code_solution, "messages": messages, "iterations": iterations, "checks": checks}
 
     def _code_check(self, state: GraphState) -> Dict[str, Any]:
         """
@@ -113,33 +146,23 @@ class LangGraphCodeAssistant:
 
         # Check imports
         print("Checking imports...")
-        import_valid, import_error = self.code_generator.check_imports(imports)
+        # Checks that already ran while the solution was streaming are reused
+        checks = state.get("checks") or {}
+        import_valid, import_error = checks.get("imports") or self.code_generator.check_imports(imports)
         if not import_valid:
             print("---CODE IMPORT CHECK: FAILED---")
             print(f"Import error: {import_error}")
-            error_message = [("user", f"Your solution failed the import test: {import_error}")]
-            messages += error_message
-            return {
-                "generation": code_solution,
-                "messages": messages,
-                "iterations": iterations,
-                "error": "yes",
-            }
+            messages += [("user", f"Your solution failed the import test: {import_error}")]
+            return self._check_failed(state, import_error)
 
         # Check execution
         print("Checking code execution...")
-        exec_valid, exec_error = self.code_generator.check_execution(imports, code)
+        exec_valid, exec_error = checks.get("execution") or self.code_generator.check_execution(imports, code)
         if not exec_valid:
             print("---CODE BLOCK CHECK: FAILED---")
             print(f"Execution error: {exec_error}")
-            error_message = [("user", f"Your solution failed the code execution test: {exec_error}")]
-            messages += error_message
-            return {
-                "generation": code_solution,
-                "messages": messages,
-                "iterations": iterations,
-                "error": "yes",
-            }
+            messages += [("user", f"Your solution failed the code execution test: {exec_error}")]
+            return self._check_failed(state, exec_error)
 
         # No errors
         print("---NO CODE TEST FAILURES---")
@@ -148,6 +171,61 @@ class LangGraphCodeAssistant:
             "messages": messages,
             "iterations": iterations,
             "error": "no",
+            "attempts": state.get("attempts", []) + [[state.get("tier", 0), ""]],
+        }
+
+    def _check_failed(self, state: GraphState, error_message: str) -> Dict[str, Any]:
+        """
+        Build the state update for a failed check.
+
+        Classifies the failure and fingerprints the solution and the error,
+        so the router can tell when a retry made no progress.
+
+        Args:
+            state: The current graph state
+            error_message: The error returned by the failed check
+
+        Returns:
+            New state with error status, error type and progress tracking
+        """
+        code_solution = state["generation"]
+        solution_hashes = state.get("solution_hashes", [])
+        error_hashes = state.get("error_hashes", [])
+
+        solution_hash = _fingerprint(code_solution.imports + "\n" + code_solution.code)
+        error_hash = _fingerprint(error_message)
+        no_progress = solution_hash in solution_hashes or (
+            bool(error_hashes) and error_hashes[-1] == error_hash
+        )
+
+        error_type = classify_error(error_message)
+        print(f"Failure type: {error_type}{' (no progress)' if no_progress else ''}")
+        metrics.inc("code_check_failures_total", error_type=error_type)
+
+        tier = state.get("tier", 0)
+        tier_failures = state.get("tier_failures", 0) + 1
+        attempts = state.get("attempts", []) + [[tier, error_type]]
+        if self.cascade:
+            next_tier = self.cascade.next_tier(tier, tier_failures, error_type, no_progress)
+            if next_tier != tier:
+                # A stronger model is a change of strategy in itself
+                print(f"Escalating to {self.cascade.models[next_tier]}")
+                tier, tier_failures, no_progress = next_tier, 0, False
+
+        return {
+            "generation": code_solution,
+            "messages": state["messages"],
+            "iterations": state["iterations"],
+            "error": "yes",
+            "error_type": error_type,
+            "solution_hashes": solution_hashes + [solution_hash],
+            "error_hashes": error_hashes + [error_hash],
+            "no_progress": no_progress,
+            # A failure that made progress ends whatever strategy led to it
+            "strategy": state.get("strategy", "") if no_progress else "",
+            "tier": tier,
+            "tier_failures": tier_failures,
+            "attempts": attempts,
         }
 
     def _reflect(self, state: GraphState) -> Dict[str, Any]:
@@ -169,13 +247,63 @@ class LangGraphCodeAssistant:
 
         # Add reflection message
         messages += [("assistant", "Reflecting on the errors and planning improvements...")]
+        if state.get("no_progress"):
+            messages += [
+                (
+                    "user",
+                    "Your last attempt repeated an earlier solution or error. Take a different approach.",
+                )
+            ]
         
-        return {"generation": code_solution, "messages": messages, "iterations": iterations}
+        return {
+            "generation": code_solution,
+            "messages": messages,
+            "iterations": iterations,
+            # Routine reflection before every retry is not a change of strategy
+            "strategy": "change_approach" if state.get("no_progress") else state.get("strategy", ""),
+        }
+
+    def _fix_imports(self, state: GraphState) -> Dict[str, Any]:
+        """
+        Narrow the next attempt to the import statements.
+
+        The model is asked for new imports only, and the next generation
+        keeps the previous description and code, replacing just the imports.
+
+        Args:
+            state: The current graph state
+
+        Returns:
+            New state asking for an imports-only fix
+        """
+        print("---FIXING IMPORTS ONLY---")
+
+        messages = state["messages"]
+        messages += [
+            (
+                "user",
+                "Only the imports are broken. Keep the description and code block unchanged and fix "
+                "the import statements, using only packages shown in the documentation.",
+            )
+        ]
+
+        return {
+            "generation": state["generation"],
+            "messages": messages,
+            "iterations": state["iterations"],
+            "strategy": "fix_imports",
+        }
 
     def _decide_to_finish(self, state: GraphState) -> str:
         """
         Determines whether to finish.
 
+        A retry that reproduces an earlier solution or the same error makes
+        no progress: the first time the model is asked to take a different
+        approach, and if that attempt repeats itself too, the loop stops
+        early instead of spending more LLM calls. Missing-module failures
+        are routed to an imports-only fix.
+
         Args:
             state: The current graph state
 
@@ -184,42 +312,128 @@ class LangGraphCodeAssistant:
         """
         error = state["error"]
         iterations = state["iterations"]
+        max_iterations = state.get("max_iterations", self.max_iterations)
 
-        if error == "no" or iterations == self.max_iterations:
+        if error == "no" or iterations >= max_iterations:
             print("---DECISION: FINISH---")
             return "end"
+        if state.get("no_progress"):
+            if state.get("strategy") == "change_approach":
+                print("---DECISION: NO PROGRESS, STOPPING EARLY---")
+                return "end"
+            print("---DECISION: NO PROGRESS, SWITCHING STRATEGY---")
+            return "reflect"
+        if state.get("error_type") == MISSING_MODULE and state.get("strategy") != "fix_imports":
+            print("---DECISION: FIX IMPORTS---")
+            return "fix_imports"
+
+        print("---DECISION: RE-TRY SOLUTION---")
+        if self.reflection_mode == "reflect":
+            return "reflect"
         else:
-            print("---DECISION: RE-TRY SOLUTION---")
-            if self.reflection_mode == "reflect":
-                return "reflect"
-            else:
-                return "generate"
+            return "generate"
 
-    def generate_solution(self, question: str) -> Dict[str, Any]:
+    def generate_solution(self, question: str, max_iterations: Optional[int] = None,
+                          on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                          cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
         """
         Generate a code solution for the given question.
         
+        Settings passed here only apply to this run, so a single assistant
+        can be shared safely between concurrent requests.
+        
         Args:
             question: The coding question to answer
+            max_iterations: Iteration limit for this run (defaults to self.max_iterations)
+            on_event: Called after each workflow step with the step name, the
+                iteration, the model of the current tier and the check outcome
+            cancel_event: When set, the run stops before its next step
             
         Returns:
             Dictionary containing the solution and metadata
+            
+        Raises:
+            RunCancelled: If cancel_event was set before the run finished
         """
         initial_state = {
             "messages": [("user", question)],
             "iterations": 0,
-            "error": ""
+            "max_iterations": max_iterations or self.max_iterations,
+            "error": "",
+            "error_type": "",
+            "solution_hashes": [],
+            "error_hashes": [],
+            "no_progress": False,
+            "strategy": "",
+            "tier": 0,
+            "tier_failures": 0,
+            "attempts": [],
+            "checks": {},
         }
         
-        # Use tracing if available
-        if config.langchain_tracing_v2 and config.langchain_api_key:
-            try:
-                tracer = LangChainTracer(project_name=config.langchain_project)
-                result = self.workflow.invoke(initial_state, config={"callbacks": [tracer]})
-            except Exception as e:
-                print(f"Warning: Failed to use LangChain tracer: {e}")
-                result = self.workflow.invoke(initial_state)
-        else:
-            result = self.workflow.invoke(initial_state)
+        started = time.monotonic()
+        # Sampled runs record spans; failed runs are always kept
+        tracer = get_tracer()
+        trace = tracer.start_trace("generate_solution", {"question": question}) if tracer else None
+        def check_cancelled(iterations):
+            if cancel_event is not None and cancel_event.is_set():
+                metrics.inc("workflow_cancelled_total")
+                raise RunCancelled(f"Run cancelled after {iterations} iterations")
+        
+        try:
+            # Steps are streamed so progress can be reported and the run
+            # cancelled before each of them; the state has no reducers, so
+            # merging each step's update rebuilds the final state
+            check_cancelled(0)
+            result = dict(initial_state)
+            for step in self.workflow.stream(
+                initial_state, config={"callbacks": trace.callbacks} if trace else None, stream_mode="updates"
+            ):
+                for node, update in step.items():
+                    result.update(update or {})
+                    if on_event:
+                        on_event({
+                            "node": node,
+                            "iteration": result["iterations"],
+                            "model": self.generators[result["tier"]].model,
+                            "error": result["error"],
+                        })
+                check_cancelled(result["iterations"])
+        except Exception as e:
+            if trace:
+                trace.finish(error=f"{type(e).__name__}: {e}")
+            raise
+        
+        # Record which model produced the passing solution
+        solved = result["error"] == "no"
+        result["solved_by"] = self.generators[result["tier"]].model if solved else None
+        if self.cascade:
+            self.cascade.record_outcome(result["attempts"], solved)
+        metrics.observe("workflow_duration_seconds", time.monotonic() - started,
+                        model=result["solved_by"] or "unsolved")
+        
+        # Report the LLM calls an early stop avoided
+        saved = 0
+        if result["error"] != "no":
+            saved = max(initial_state["max_iterations"] - result["iterations"], 0)
+        result["llm_calls_saved"] = saved
+        if saved:
+            print(f"Stopped early, saved {saved} LLM calls")
+            metrics.inc("llm_calls_saved_total", saved)
+        
+        if trace:
+            trace.finish(
+                outputs={
+                    "generation": result["generation"],
+                    "iterations": result["iterations"],
+                    "solved_by": result["solved_by"],
+                    "llm_calls_saved": saved,
+                },
+                error=None if solved else f"Code checks failed: {result['error_type']}",
+            )
         
         return result
+
+
+def _fingerprint(text: str) -> str:
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()[:16]
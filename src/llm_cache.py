@@ -0,0 +1,84 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import BaseMessage, messages_to_dict
+from .shared_cache import SQLiteCache
+from .metrics import metrics
+from .config import config
+
+# Cache modes
+OFF = "off"
+READ_THROUGH = "read_through"  # serve hits, call the LLM and record on misses
+RECORD = "record"              # always call the LLM and record the response
+REPLAY = "replay"              # serve hits only; a miss is an error
+
+MODES = (OFF, READ_THROUGH, RECORD, REPLAY)
+
+
+class LLMCacheMiss(Exception):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+class LLMCache:
+    """
+    Content-addressed store of LLM responses.
+
+    Responses are keyed by the model, the temperature, the output schema and
+    a hash of the exact formatted prompt, so a hit is only possible when the
+    request would be byte-for-byte identical. Entries live in SQLite and can
+    be shared between processes and replayed offline.
+    """
+
+    def __init__(self, path: str, mode: str = READ_THROUGH):
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM cache mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.store = SQLiteCache(path, namespace="llm")
+
+    @classmethod
+    def from_config(cls) -> Optional["LLMCache"]:
+        """Build the cache described by LLM_CACHE_MODE and LLM_CACHE_PATH, or None if off."""
+        if config.llm_cache_mode == OFF:
+            return None
+        return cls(config.llm_cache_path, config.llm_cache_mode)
+
+    @staticmethod
+    def key(model: str, temperature: float, schema: str, prompt: List[BaseMessage]) -> str:
+        """Content address of a request."""
+        payload = json.dumps(
+            {
+                "model": model,
+                "temperature": temperature,
+                "schema": schema,
+                "prompt": messages_to_dict(prompt),
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the recorded response for key.
+
+        Returns:
+            The recorded response, or None when the LLM should be called
+
+        Raises:
+            LLMCacheMiss: In replay mode, when nothing was recorded for key
+        """
+        if self.mode == RECORD:
+            return None
+        value = self.store.get(key)
+        if value is not None:
+            metrics.inc("llm_cache_hits_total")
+            return value
+        metrics.inc("llm_cache_misses_total")
+        if self.mode == REPLAY:
+            raise LLMCacheMiss(f"No recorded LLM response for request {key[:12]} in {self.path}")
+        return None
+
+    def record(self, key: str, value: Dict[str, Any]):
+        """Store a response unless the cache is replay-only."""
+        if self.mode in (READ_THROUGH, RECORD):
+            self.store.set(key, value)
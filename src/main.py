@@ -12,7 +12,7 @@ def main():
     parser.add_argument("--context-url", default="https://python.langchain.com/docs/concepts/lcel/",
                        help="URL to load documentation from")
     parser.add_argument("--model", default=config.default_model,
-                       help="OpenAI model to use")
+                       help="OpenAI model to use, or 'cascade' to start cheap and escalate on failure")
     parser.add_argument("--max-iterations", type=int, default=config.max_iterations,
                        help="Maximum number of iterations")
     parser.add_argument("--verbose", "-v", action="store_true",
@@ -33,13 +33,12 @@ def main():
         
         # Create assistant
         assistant = LangGraphCodeAssistant(context, model=args.model)
-        assistant.max_iterations = args.max_iterations
         
         # Generate solution
         if args.verbose:
             print(f"Generating solution for: {args.question}")
         
-        result = assistant.generate_solution(args.question)
+        result = assistant.generate_solution(args.question, max_iterations=args.max_iterations)
         
         # Display results
         print("\n" + "="*50)
@@ -53,7 +52,11 @@ def main():
             print(f"\nCode:\n{solution.code}")
         
         print(f"\nIterations used: {result['iterations']}")
+        if result.get("solved_by"):
+            print(f"Solved by: {result['solved_by']}")
         print(f"Final error status: {result['error']}")
+        if result.get("llm_calls_saved"):
+            print(f"LLM calls saved by stopping early: {result['llm_calls_saved']}")
         
         if args.verbose:
             print(f"\nFull conversation:")
@@ -0,0 +1,87 @@
+import threading
+from typing import Dict, Any, Tuple
+
+
+class Metrics:
+    """Thread-safe in-process registry of counters, gauges and histograms."""
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple, float] = {}
+        self._gauges: Dict[Tuple, float] = {}
+        self._histograms: Dict[Tuple, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple:
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increase a counter by value."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to the given value."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a value in a histogram."""
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = {"buckets": [0] * len(self.DEFAULT_BUCKETS), "sum": 0.0, "count": 0}
+                self._histograms[key] = hist
+            for i, bound in enumerate(self.DEFAULT_BUCKETS):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a plain-dict copy of every metric, keyed by name and labels."""
+        def fmt(key):
+            name, labels = key
+            if not labels:
+                return name
+            return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+        with self._lock:
+            return {
+                "counters": {fmt(k): v for k, v in self._counters.items()},
+                "gauges": {fmt(k): v for k, v in self._gauges.items()},
+                "histograms": {
+                    fmt(k): {"sum": h["sum"], "count": h["count"]}
+                    for k, h in self._histograms.items()
+                },
+            }
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        def labels_str(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                lines.append(f"{name}{labels_str(labels)} {value}")
+            for (name, labels), value in sorted(self._gauges.items()):
+                lines.append(f"{name}{labels_str(labels)} {value}")
+            for (name, labels), hist in sorted(self._histograms.items()):
+                for bound, count in zip(self.DEFAULT_BUCKETS, hist["buckets"]):
+                    lines.append(f"{name}_bucket{labels_str(labels, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{labels_str(labels, [('le', '+Inf')])} {hist['count']}")
+                lines.append(f"{name}_sum{labels_str(labels)} {hist['sum']}")
+                lines.append(f"{name}_count{labels_str(labels)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
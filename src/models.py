@@ -1,4 +1,4 @@
-from typing import List, TypedDict
+from typing import Dict, List, TypedDict
 from pydantic import BaseModel, Field
 
 
@@ -8,8 +8,25 @@ class CodeSolution(BaseModel):
     code: str = Field(description="Code block not including import statements")
 
 
+class CodeFirstSolution(BaseModel):
+    """CodeSolution with the fields reordered so code streams before the description."""
+    imports: str = Field(description="Code block import statements")
+    code: str = Field(description="Code block not including import statements")
+    prefix: str = Field(description="Description of the problem and approach")
+
+
 class GraphState(TypedDict):
     error: str
     messages: List
     generation: CodeSolution
     iterations: int
+    max_iterations: int
+    error_type: str
+    solution_hashes: List[str]
+    error_hashes: List[str]
+    no_progress: bool
+    strategy: str
+    tier: int
+    tier_failures: int
+    attempts: List
+    checks: Dict
@@ -0,0 +1,310 @@
+import email.message
+import enum
+import hashlib
+import importlib
+import io
+import socket
+import threading
+import types
+import urllib.request
+import urllib.response
+from collections.abc import Iterable, Mapping
+from typing import Annotated, Any, Dict, List, Literal, Union, get_args, get_origin
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel, LLM
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+
+# Text of every faked completion; valid JSON so JSON output parsers accept it
+FAKE_REPLY = "{}"
+
+# Calls intercepted in this process; see disable_network()
+_calls: List[Dict[str, str]] = []
+
+
+def _record(kind: str, target: str):
+    _calls.append({"kind": kind, "target": target})
+
+
+def _placeholder_value(annotation: Any) -> Any:
+    """An empty value of the given type, e.g. [] for List[str]."""
+    origin = get_origin(annotation)
+    if origin is Annotated:
+        return _placeholder_value(get_args(annotation)[0])
+    if origin is Literal:
+        return get_args(annotation)[0]
+    if origin is Union or origin is types.UnionType:
+        # Optional[X] gets an X, so code can use it without a None check
+        options = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return _placeholder_value(options[0]) if options else None
+    kind = origin or annotation
+    if not isinstance(kind, type):
+        return None
+    if issubclass(kind, BaseModel):
+        return _placeholder(kind)
+    if issubclass(kind, enum.Enum):
+        return next(iter(kind), None)
+    if issubclass(kind, (str, bytes, bool, int, float)):
+        return kind()
+    if issubclass(kind, tuple):
+        return ()
+    if issubclass(kind, (set, frozenset)):
+        return kind()
+    if issubclass(kind, Mapping):
+        return {}
+    if issubclass(kind, Iterable):
+        return []
+    return None
+
+
+def _placeholder(schema: Any) -> Any:
+    """An instance of a structured-output schema filled with empty values of the right types."""
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        values = {
+            name: _placeholder_value(field.annotation) if field.is_required()
+            else field.get_default(call_default_factory=True)
+            for name, field in schema.model_fields.items()
+        }
+        return schema.model_construct(**values)
+    return {}
+
+
+class FakeChatModel(BaseChatModel):
+    """Stands in for chat model clients; answers instantly and deterministically."""
+
+    def __init__(self, **kwargs):
+        _record("llm", f"{type(self).__name__}(model={kwargs.get('model') or kwargs.get('model_name')})")
+        super().__init__(**kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "offline-fake-chat"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        _record("llm_call", "chat")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=FAKE_REPLY))])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        def respond(_):
+            _record("llm_call", f"structured output ({getattr(schema, '__name__', 'schema')})")
+            if include_raw:
+                return {"raw": AIMessage(content=FAKE_REPLY), "parsed": _placeholder(schema), "parsing_error": None}
+            return _placeholder(schema)
+
+        return RunnableLambda(respond)
+
+
+class FakeLLM(LLM):
+    """Stands in for completion model clients."""
+
+    def __init__(self, **kwargs):
+        _record("llm", f"{type(self).__name__}(model={kwargs.get('model') or kwargs.get('model_name')})")
+        super().__init__(**kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "offline-fake-llm"
+
+    def _call(self, prompt: str, stop=None, run_manager=None, **kwargs) -> str:
+        _record("llm_call", "completion")
+        return FAKE_REPLY
+
+
+class FakeEmbeddings(Embeddings):
+    """Stands in for embedding clients with small deterministic vectors."""
+
+    size = 16
+
+    def __init__(self, **kwargs):
+        _record("embeddings", f"{type(self).__name__}(model={kwargs.get('model')})")
+
+    def _embed(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [b / 255 for b in digest[:self.size]]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        _record("embedding_call", f"{len(texts)} documents")
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        _record("embedding_call", "query")
+        return self._embed(text)
+
+
+def _fake_chat_completion(self, *args, model: str = "", messages=(), stream: bool = False, **kwargs):
+    _record("llm_call", f"openai chat.completions ({model})")
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+    text = FAKE_REPLY
+    if stream:
+        chunk = ChatCompletionChunk.model_validate({
+            "id": "offline", "object": "chat.completion.chunk", "created": 0, "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "delta": {"role": "assistant", "content": text}}],
+        })
+        return iter([chunk])
+    return ChatCompletion.model_validate({
+        "id": "offline", "object": "chat.completion", "created": 0, "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+    })
+
+
+def _fake_completion(self, *args, model: str = "", prompt="", **kwargs):
+    _record("llm_call", f"openai completions ({model})")
+    from openai.types import Completion
+
+    return Completion.model_validate({
+        "id": "offline", "object": "text_completion", "created": 0, "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "text": FAKE_REPLY}],
+    })
+
+
+def _fake_embedding(self, *args, model: str = "", input=(), **kwargs):
+    _record("embedding_call", f"openai embeddings ({model})")
+    from openai.types import CreateEmbeddingResponse
+
+    texts = [input] if isinstance(input, str) else list(input)
+    embedder = FakeEmbeddings.__new__(FakeEmbeddings)
+    return CreateEmbeddingResponse.model_validate({
+        "object": "list", "model": model,
+        "data": [{"object": "embedding", "index": i, "embedding": embedder._embed(str(t))} for i, t in enumerate(texts)],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    })
+
+
+def _async(fake):
+    async def call(self, *args, **kwargs):
+        return fake(self, *args, **kwargs)
+    return call
+
+
+# Attributes swapped for fakes in an offline check: the
+# LangChain clients wherever they can be imported from, including their
+# defining modules, and the OpenAI SDK's request entry points
+_FAKES = {
+    ("langchain_openai", "ChatOpenAI"): FakeChatModel,
+    ("langchain_openai.chat_models", "ChatOpenAI"): FakeChatModel,
+    ("langchain_openai.chat_models.base", "ChatOpenAI"): FakeChatModel,
+    ("langchain_openai", "AzureChatOpenAI"): FakeChatModel,
+    ("langchain_openai.chat_models", "AzureChatOpenAI"): FakeChatModel,
+    ("langchain_openai.chat_models.azure", "AzureChatOpenAI"): FakeChatModel,
+    ("langchain_openai", "OpenAI"): FakeLLM,
+    ("langchain_openai.llms", "OpenAI"): FakeLLM,
+    ("langchain_openai.llms.base", "OpenAI"): FakeLLM,
+    ("langchain_openai", "AzureOpenAI"): FakeLLM,
+    ("langchain_openai.llms", "AzureOpenAI"): FakeLLM,
+    ("langchain_openai.llms.azure", "AzureOpenAI"): FakeLLM,
+    ("langchain_openai", "OpenAIEmbeddings"): FakeEmbeddings,
+    ("langchain_openai.embeddings", "OpenAIEmbeddings"): FakeEmbeddings,
+    ("langchain_openai.embeddings.base", "OpenAIEmbeddings"): FakeEmbeddings,
+    ("langchain_openai", "AzureOpenAIEmbeddings"): FakeEmbeddings,
+    ("langchain_openai.embeddings", "AzureOpenAIEmbeddings"): FakeEmbeddings,
+    ("langchain_openai.embeddings.azure", "AzureOpenAIEmbeddings"): FakeEmbeddings,
+    ("openai.resources.chat.completions", "Completions.create"): _fake_chat_completion,
+    ("openai.resources.chat.completions", "AsyncCompletions.create"): _async(_fake_chat_completion),
+    ("openai.resources.completions", "Completions.create"): _fake_completion,
+    ("openai.resources.completions", "AsyncCompletions.create"): _async(_fake_completion),
+    ("openai.resources.embeddings", "Embeddings.create"): _fake_embedding,
+    ("openai.resources.embeddings", "AsyncEmbeddings.create"): _async(_fake_embedding),
+}
+
+_lock = threading.Lock()
+
+
+def _owner(module_name: str, path: str):
+    """Resolve "Class.attr" in a module to (object holding attr, attr name)."""
+    owner = importlib.import_module(module_name)
+    *parents, attr = path.split(".")
+    for parent in parents:
+        owner = getattr(owner, parent)
+    return owner, attr
+
+
+def _swap_clients():
+    for (module_name, path), fake in _FAKES.items():
+        try:
+            owner, attr = _owner(module_name, path)
+        except (ImportError, AttributeError):
+            continue
+        if attr in vars(owner):
+            setattr(owner, attr, fake)
+
+
+def _patch_httpx(httpx):
+    def client_send(client, request, **kwargs):
+        _record("http", f"{request.method} {request.url}")
+        return httpx.Response(200, json={}, request=request)
+
+    async def async_send(client, request, **kwargs):
+        _record("http", f"{request.method} {request.url}")
+        return httpx.Response(200, json={}, request=request)
+
+    httpx.Client.send = client_send
+    httpx.AsyncClient.send = async_send
+
+
+def _patch_transports():
+    try:
+        import requests
+
+        def send(session, request, **kwargs):
+            _record("http", f"{request.method} {request.url}")
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b"{}"
+            response.headers["Content-Type"] = "application/json"
+            response.url = request.url
+            response.request = request
+            return response
+
+        requests.Session.send = send
+    except ImportError:
+        pass
+
+    # httpx2 is the fork of httpx used by recent OpenAI SDKs
+    for module_name in ("httpx", "httpx2"):
+        try:
+            _patch_httpx(importlib.import_module(module_name))
+        except ImportError:
+            pass
+
+    def opener_open(opener, fullurl, data=None, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
+        url = fullurl if isinstance(fullurl, str) else fullurl.full_url
+        _record("http", f"{'POST' if data else 'GET'} {url}")
+        return urllib.response.addinfourl(io.BytesIO(b"{}"), email.message.Message(), url, 200)
+
+    urllib.request.OpenerDirector.open = opener_open
+
+    # Anything else that reaches the network fails fast instead of hanging
+    def connect(sock, address):
+        _record("socket", str(address))
+        raise ConnectionRefusedError(f"Network access is disabled in offline checks: {address}")
+
+    socket.socket.connect = connect
+
+    def getaddrinfo(host, *args, **kwargs):
+        _record("dns", str(host))
+        raise socket.gaierror(f"Name resolution is disabled in offline checks: {host}")
+
+    socket.getaddrinfo = getaddrinfo
+
+
+def disable_network() -> List[Dict[str, str]]:
+    """
+    Replace LLM, embedding and HTTP clients with fakes for the rest of the process.
+
+    Nothing is restored afterwards, so this must only be called in a process
+    that exists to run one offline check, such as a sandbox child. Threads
+    started by the checked code are covered as well.
+
+    Returns:
+        List that collects a {"kind", "target"} entry per intercepted call
+    """
+    with _lock:
+        _patch_transports()
+        _swap_clients()
+    return _calls
@@ -0,0 +1,208 @@
+import atexit
+import importlib
+import os
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Connection
+from typing import Dict, List, Optional, Tuple
+from langchain_core.exceptions import OutputParserException
+from .offline_exec import disable_network
+
+# Modules most solutions import, loaded once by the fork server
+PRELOAD = ("langchain_core.prompts", "langchain_openai")
+
+
+def _execute(conn: Connection):
+    """Run one solution in a forked child and send back (ok, error, intercepted calls)."""
+    conn.send(os.getpid())
+    source, offline = conn.recv()
+    # Offline checks swap model, embedding and HTTP clients for fakes; the
+    # child only runs this one solution, so the whole process goes offline
+    calls = disable_network() if offline else []
+    try:
+        exec(source, {"__name__": "generated_solution"})
+        result = (True, "")
+    except SystemExit as e:
+        result = (False, f"SystemExit: solution exited with code {e.code}")
+    except OutputParserException as e:
+        # Offline, only a fake's canned reply can be what failed to parse
+        result = (True, "") if offline else (False, f"{type(e).__name__}: {e}")
+    except Exception as e:
+        result = (False, f"{type(e).__name__}: {e}")
+    conn.send((*result, list(calls)))
+
+
+def _reap_children():
+    try:
+        while os.waitpid(-1, os.WNOHANG)[0]:
+            pass
+    except ChildProcessError:
+        pass
+
+
+def serve(address: str, preload: List[str]):
+    """
+    Fork server main loop: fork a child for every connection to address.
+
+    The server stays single-threaded so forking is safe, and exits when its
+    stdin closes, i.e. when the process that started it is gone.
+    """
+    for module in preload:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+    listener = socket.socket(socket.AF_UNIX)
+    listener.bind(address)
+    listener.listen(64)
+    while True:
+        ready, _, _ = select.select([listener, sys.stdin], [], [], 0.5)
+        # Reaping finished children adds their CPU time to this process's
+        # totals, where monitoring (e.g. the load test) can see it
+        _reap_children()
+        if sys.stdin in ready:
+            os._exit(0)
+        if listener not in ready:
+            continue
+        client, _ = listener.accept()
+        if os.fork() == 0:
+            listener.close()
+            try:
+                _execute(Connection(client.detach()))
+            finally:
+                # Do not wait for threads the solution may have left running
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(0)
+        client.close()
+
+
+class ExecutionSandbox:
+    """
+    Runs solutions in child processes that are killed when they time out.
+
+    Children are forked from a helper process that has the usual
+    dependencies of solutions already imported, so a check costs a fork
+    rather than a fresh interpreter. Anything a solution does (a hanging
+    loop, threads, monkeypatching, sys.exit) ends with its child.
+    """
+
+    def __init__(self, preload=PRELOAD, start_timeout: float = 60):
+        self.preload = list(preload)
+        self.start_timeout = start_timeout
+        self._lock = threading.Lock()
+        self._server: Optional[subprocess.Popen] = None
+        self._directory: Optional[str] = None
+        self._address: Optional[str] = None
+        atexit.register(self.close)
+
+    def run(self, source: str, offline: bool, timeout: float) -> Tuple[bool, str, List[Dict[str, str]]]:
+        """
+        Execute source in a fresh child process.
+
+        Args:
+            source: The solution's imports and code
+            offline: Whether to run it with LLM and HTTP clients faked
+            timeout: Seconds before the child is killed
+
+        Returns:
+            Tuple of (ok, error_message, intercepted_calls), where
+            error_message starts with the exception type name
+        """
+        if not hasattr(os, "fork"):
+            return self._run_spawned(source, offline, timeout)
+        conn = self._connect()
+        try:
+            pid = conn.recv()
+            conn.send((source, offline))
+            if not conn.poll(timeout):
+                os.kill(pid, signal.SIGKILL)
+                return False, f"TimeoutError: execution did not finish within {timeout:.0f}s", []
+            return conn.recv()
+        except EOFError:
+            return False, "ProcessExit: the execution process died before reporting a result", []
+        finally:
+            conn.close()
+
+    def _run_spawned(self, source: str, offline: bool, timeout: float):
+        """Fallback without fork (Windows): a fresh interpreter per check."""
+        import multiprocessing
+
+        conn, child_conn = multiprocessing.Pipe()
+        worker = multiprocessing.get_context("spawn").Process(target=_execute, args=(child_conn,), daemon=True)
+        worker.start()
+        child_conn.close()
+        try:
+            conn.recv()
+            conn.send((source, offline))
+            if not conn.poll(timeout):
+                worker.kill()
+                return False, f"TimeoutError: execution did not finish within {timeout:.0f}s", []
+            return conn.recv()
+        except EOFError:
+            return False, "ProcessExit: the execution process died before reporting a result", []
+        finally:
+            conn.close()
+            worker.join(1)
+            if worker.is_alive():
+                worker.kill()
+
+    def close(self):
+        """Stop the fork server."""
+        with self._lock:
+            if self._server is not None:
+                self._server.stdin.close()
+                self._server.wait()
+                self._server = None
+            if self._directory:
+                shutil.rmtree(self._directory, ignore_errors=True)
+                self._directory = None
+
+    def _connect(self) -> Connection:
+        with self._lock:
+            if self._server is None or self._server.poll() is not None:
+                self._start()
+            address = self._address
+        deadline = time.monotonic() + self.start_timeout
+        while True:
+            try:
+                return Client(address, family="AF_UNIX")
+            except (FileNotFoundError, ConnectionRefusedError):
+                # The server is still importing its preload modules
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def _start(self):
+        if self._directory:
+            shutil.rmtree(self._directory, ignore_errors=True)
+        # A private directory keeps other users off the socket
+        self._directory = tempfile.mkdtemp(prefix="exec-sandbox-")
+        self._address = os.path.join(self._directory, "server.sock")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+        self._server = subprocess.Popen(
+            [sys.executable, "-c", f"import sys; from {__name__} import serve; serve(sys.argv[1], sys.argv[2:])",
+             self._address, *self.preload],
+            stdin=subprocess.PIPE,
+            env=env,
+        )
+
+
+_sandbox: Optional[ExecutionSandbox] = None
+_sandbox_lock = threading.Lock()
+
+
+def get_sandbox() -> ExecutionSandbox:
+    """Return the process-wide execution sandbox, creating it on first use."""
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = ExecutionSandbox()
+        return _sandbox
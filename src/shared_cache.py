@@ -0,0 +1,111 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class SQLiteCache:
+    """
+    Key/value cache stored in SQLite that is safe to share between threads
+    and worker processes.
+
+    Values are stored as JSON. Each thread keeps its own connection, and the
+    database runs in WAL mode so readers never block the single writer.
+    With max_age, entries older than that many seconds are treated as
+    missing; with max_entries, the oldest entries of the namespace are
+    dropped once it grows past that size.
+    """
+
+    # Writes between two prunes of expired and excess entries
+    prune_every = 100
+
+    def __init__(self, path: str, namespace: str = "default",
+                 max_age: Optional[float] = None, max_entries: Optional[int] = None):
+        self.path = path
+        self.namespace = namespace
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._writes = 0
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if it is missing."""
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND created_at >= ?",
+            (self.namespace, key, self._oldest_valid()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serializable value under key."""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), time.time()),
+            )
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune()
+
+    def increment(self, key: str, counts: Dict[str, float]):
+        """
+        Atomically add counts to the numeric fields of the JSON object under key.
+
+        Missing keys and fields start at zero. The update is a single
+        statement, so concurrent increments from other processes are not lost.
+        """
+        fields = list(counts)
+        assignments = ", ".join("?, COALESCE(json_extract(value, ?), 0) + ?" for _ in fields)
+        params = [value for field in fields for value in (f"$.{field}", f"$.{field}", counts[field])]
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO cache (namespace, key, value, created_at) VALUES (?, ?, ?, ?) "
+                f"ON CONFLICT (namespace, key) DO UPDATE SET value = json_set(value, {assignments}), "
+                "created_at = excluded.created_at",
+                (self.namespace, key, json.dumps(counts), time.time(), *params),
+            )
+
+    def delete(self, key: str):
+        """Remove key from the cache if present."""
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+
+    def prune(self):
+        """Delete expired entries and the oldest ones beyond max_entries."""
+        with self._connection() as conn:
+            if self.max_age is not None:
+                conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND created_at < ?",
+                    (self.namespace, self._oldest_valid()),
+                )
+            if self.max_entries is not None:
+                conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key NOT IN ("
+                    "SELECT key FROM cache WHERE namespace = ? ORDER BY created_at DESC LIMIT ?)",
+                    (self.namespace, self.namespace, self.max_entries),
+                )
+
+    def _oldest_valid(self) -> float:
+        return time.time() - self.max_age if self.max_age is not None else 0.0
@@ -0,0 +1,146 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+from .metrics import metrics
+
+
+class Flight:
+    """
+    One in-flight call shared by every request that asked for the same key.
+
+    The call runs on its own thread, so it is not tied to the request that
+    started it. Progress events it publishes are kept, so a request that
+    joins late still sees them from the beginning.
+    """
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.cancelled = threading.Event()
+        self.waiters = 0
+        self._events: List[Any] = []
+        self._cond = threading.Condition()
+        self._done = False
+        self._result = None
+        self._error: Optional[BaseException] = None
+
+    def publish(self, event: Any):
+        """Hand a progress event to every current and future waiter."""
+        with self._cond:
+            self._events.append(event)
+            self._cond.notify_all()
+
+    def events(self) -> Iterator[Any]:
+        """Yield all progress events, blocking for new ones until the call finishes."""
+        index = 0
+        while True:
+            with self._cond:
+                while index == len(self._events) and not self._done:
+                    self._cond.wait()
+                pending = self._events[index:]
+                index = len(self._events)
+                done = self._done
+            yield from pending
+            if done:
+                return
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """
+        Wait for the call and return its result.
+
+        Raises:
+            Exception: Whatever the call raised, re-raised in every waiter
+            TimeoutError: If the call did not finish within timeout
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._done, timeout):
+                raise TimeoutError(f"Call for {self.key!r} did not finish within {timeout}s")
+            if self._error is not None:
+                raise self._error
+            return self._result
+
+    def _finish(self, result: Any = None, error: Optional[BaseException] = None):
+        with self._cond:
+            self._result = result
+            self._error = error
+            self._done = True
+            self._cond.notify_all()
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls into one.
+
+    The first request for a key becomes the leader and starts the call;
+    requests for the same key that arrive while it runs become followers
+    and wait for the same result, or the same exception. A key is forgotten
+    as soon as its call finishes, so later requests start a fresh call.
+    When every waiter has left before the call finished, the flight's
+    `cancelled` event is set for the call to stop at its next checkpoint.
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Flight] = {}
+
+    @contextmanager
+    def join(self, key: Hashable, fn: Callable[[Flight], Any]) -> Iterator[Tuple[Flight, bool]]:
+        """
+        Attach to the flight for key, starting fn(flight) if none is running.
+
+        Args:
+            key: Identity of the call; equal keys share one call
+            fn: The call; it may publish progress on the flight and should
+                stop when flight.cancelled is set
+
+        Yields:
+            The flight and whether this request is its leader
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = Flight(key)
+                self._flights[key] = flight
+            flight.waiters += 1
+        metrics.inc(f"{self.name}_leaders_total" if leader else f"{self.name}_coalesced_total")
+        if leader:
+            threading.Thread(target=self._run, args=(flight, fn), name=f"{self.name}-flight", daemon=True).start()
+        try:
+            yield flight, leader
+        finally:
+            self._leave(flight)
+
+    def inflight(self) -> int:
+        """Number of distinct calls currently running."""
+        with self._lock:
+            return len(self._flights)
+
+    def _run(self, flight: Flight, fn: Callable[[Flight], Any]):
+        try:
+            result = fn(flight)
+        except BaseException as e:
+            flight._finish(error=e)
+        else:
+            flight._finish(result=result)
+        finally:
+            self._forget(flight)
+
+    def _leave(self, flight: Flight):
+        with self._lock:
+            flight.waiters -= 1
+            abandoned = flight.waiters == 0 and not flight._done
+            if abandoned:
+                # Nobody is waiting any more; new requests start their own call
+                self._forget_locked(flight)
+        if abandoned:
+            flight.cancelled.set()
+            metrics.inc(f"{self.name}_cancelled_total")
+
+    def _forget(self, flight: Flight):
+        with self._lock:
+            self._forget_locked(flight)
+
+    def _forget_locked(self, flight: Flight):
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
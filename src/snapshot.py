@@ -0,0 +1,117 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Union
+
+MAGIC = b"LGSNAP1\n"
+_HEADER_LEN = struct.Struct("<Q")
+
+
+def write_snapshot(path: str, sections: Dict[str, Union[str, bytes]]) -> str:
+    """
+    Write named sections (docs text, index blobs, ...) into one snapshot file.
+
+    The file is written to a temporary path and renamed into place, so
+    workers that already have the old snapshot mapped keep a consistent view.
+
+    Args:
+        path: Destination file path
+        sections: Mapping of section name to text or raw bytes
+
+    Returns:
+        The path that was written
+    """
+    header = {"sections": {}}
+    blobs = []
+    offset = 0
+    for name, value in sections.items():
+        data = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+        header["sections"][name] = {
+            "offset": offset,
+            "length": len(data),
+            "chars": len(value) if isinstance(value, str) else None,
+            "sha256": hashlib.sha256(data).hexdigest(),
+        }
+        blobs.append(data)
+        offset += len(data)
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LEN.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for data in blobs:
+            f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+class SharedSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+
+    Every process that opens the same file shares its pages through the OS
+    page cache, so the crawled docs (and any index stored next to them) are
+    held once in memory no matter how many workers are running.
+    """
+
+    def __init__(self, path: str, section: str = "context"):
+        self.path = path
+        self.section_name = section
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a context snapshot")
+        (header_len,) = _HEADER_LEN.unpack_from(self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + _HEADER_LEN.size
+        self._data_start = header_start + header_len
+        self._sections = json.loads(self._mmap[header_start:self._data_start])["sections"]
+
+    def section(self, name: str) -> memoryview:
+        """Zero-copy view of a section's bytes."""
+        info = self._sections[name]
+        start = self._data_start + info["offset"]
+        return memoryview(self._mmap)[start:start + info["length"]]
+
+    def sections(self) -> list:
+        """Names of all sections in the snapshot."""
+        return list(self._sections)
+
+    def text(self, name: str = None) -> str:
+        """Decode a text section. The returned string is a transient copy."""
+        return str(self.section(name or self.section_name), "utf-8")
+
+    @property
+    def sha256(self) -> str:
+        """Content hash of the default section."""
+        return self._sections[self.section_name]["sha256"]
+
+    def __len__(self) -> int:
+        info = self._sections[self.section_name]
+        return info["chars"] if info["chars"] is not None else info["length"]
+
+    def __str__(self) -> str:
+        return self.text()
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+def context_text(context: Union[str, SharedSnapshot]) -> str:
+    """Return the context as a string, whether it is plain text or a snapshot."""
+    if isinstance(context, SharedSnapshot):
+        return context.text()
+    return context
+
+
+def context_hash(context: Union[str, SharedSnapshot]) -> str:
+    """Content hash of the context, without decoding snapshots."""
+    if isinstance(context, SharedSnapshot):
+        return context.sha256
+    return hashlib.sha256(context.encode("utf-8")).hexdigest()
@@ -0,0 +1,304 @@
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from pydantic import BaseModel
+from .metrics import metrics
+from .config import config
+
+# Longest string kept in span inputs and outputs
+MAX_FIELD_CHARS = 2000
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _safe(value: Any, depth: int = 0) -> Any:
+    """Make a value JSON-friendly and truncate long strings (e.g. the docs context)."""
+    if depth > 6:
+        return "..."
+    if isinstance(value, str):
+        return value if len(value) <= MAX_FIELD_CHARS else value[:MAX_FIELD_CHARS] + "...[truncated]"
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, BaseModel):
+        return _safe(value.model_dump(), depth + 1)
+    if isinstance(value, BaseMessage):
+        return {"type": value.type, "content": _safe(value.content, depth + 1)}
+    if isinstance(value, dict):
+        return {str(k): _safe(v, depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_safe(v, depth + 1) for v in value]
+    return _safe(str(value), depth + 1)
+
+
+def _snapshot(value: Any) -> Any:
+    """Cheap copy that stops later in-place appends (e.g. to messages) showing up in a span."""
+    if isinstance(value, dict):
+        return {k: list(v) if isinstance(v, list) else v for k, v in value.items()}
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def _as_dict(value: Any, key: str) -> Dict[str, Any]:
+    value = _safe(value)
+    return value if isinstance(value, dict) else {key: value}
+
+
+class SpanRecorder(BaseCallbackHandler):
+    """
+    Collects the spans of one run in memory; nothing is exported here.
+
+    Inputs and outputs are kept as references and only made JSON-friendly
+    by the exporter thread, so recording stays cheap on the request path.
+    The time spent in these callbacks is tracked in `overhead`.
+    """
+
+    def __init__(self, root_id: uuid.UUID):
+        self.root_id = root_id
+        self.spans: Dict[uuid.UUID, Dict[str, Any]] = {}
+        self.overhead = 0.0
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, parent_run_id, name, run_type, inputs):
+        started = time.perf_counter()
+        with self._lock:
+            self.spans[run_id] = {
+                "id": run_id,
+                "parent_run_id": parent_run_id or self.root_id,
+                "name": name,
+                "run_type": run_type,
+                "start_time": _now(),
+                "inputs": _snapshot(inputs),
+            }
+            self.overhead += time.perf_counter() - started
+
+    def _end(self, run_id, outputs=None, error=None):
+        started = time.perf_counter()
+        with self._lock:
+            span = self.spans.get(run_id)
+            if span is not None:
+                span["end_time"] = _now()
+                if outputs is not None:
+                    span["outputs"] = _snapshot(outputs)
+                if error is not None:
+                    span["error"] = f"{type(error).__name__}: {error}"
+            self.overhead += time.perf_counter() - started
+
+    @staticmethod
+    def _name(serialized, kwargs, default):
+        return kwargs.get("name") or (serialized or {}).get("name") or default
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "chain"), "chain", inputs)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id, outputs=outputs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "chat_model"), "llm",
+                    {"messages": messages})
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "llm"), "llm", {"prompts": prompts})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, outputs={"generations": [[g.text for g in gens] for gens in response.generations]})
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+
+class Trace:
+    """
+    Handle for one traced request.
+
+    Pass `callbacks` to the run and call finish() once it is over. Every run
+    is recorded in memory; the sampling decision is applied at the end, so
+    sampled runs and failed runs are exported in full and the rest are
+    dropped.
+    """
+
+    def __init__(self, pipeline: "TracingPipeline", name: str, inputs: Dict[str, Any], sampled: bool):
+        started = time.perf_counter()
+        self.pipeline = pipeline
+        self.root_id = uuid.uuid4()
+        self.name = name
+        self.inputs = inputs
+        self.sampled = sampled
+        self.start_time = _now()
+        self.recorder = SpanRecorder(self.root_id)
+        self.callbacks: List[BaseCallbackHandler] = [self.recorder]
+        self._setup_overhead = time.perf_counter() - started
+
+    def finish(self, outputs: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """
+        Close the root span and hand the trace to the export queue if it is kept.
+
+        Args:
+            outputs: Run outputs for the root span
+            error: Error description when the run failed
+        """
+        started = time.perf_counter()
+        if self.sampled or error:
+            root = {
+                "id": self.root_id,
+                "parent_run_id": None,
+                "name": self.name,
+                "run_type": "chain",
+                "start_time": self.start_time,
+                "end_time": _now(),
+                "inputs": self.inputs,
+                "outputs": outputs or {},
+            }
+            if error:
+                root["error"] = error
+            metrics.inc("traces_kept_total", reason="sampled" if self.sampled else "error")
+            self.pipeline.enqueue([root] + list(self.recorder.spans.values()))
+        # Everything tracing added to the request path, callbacks included
+        overhead = self._setup_overhead + self.recorder.overhead + time.perf_counter() - started
+        metrics.observe("trace_overhead_seconds", overhead, sampled=self.sampled)
+
+
+class TracingPipeline:
+    """
+    Process-wide tracer: head sampling, a bounded queue and a background exporter.
+
+    Spans never leave the request thread synchronously. A daemon thread
+    drains the queue and exports in batches to LangSmith, or appends them to
+    a local JSONL file when there is no API key or LangSmith is unreachable.
+    When the queue is full new traces are dropped rather than blocking.
+    """
+
+    def __init__(self, sample_rate: float, queue_size: int, batch_size: int,
+                 flush_interval: float, project: str, local_path: str,
+                 api_key: Optional[str] = None):
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.project = project
+        self.local_path = local_path
+        self.client = None
+        if api_key:
+            try:
+                from langsmith import Client
+                self.client = Client(api_key=api_key)
+            except Exception as e:
+                print(f"Failed to initialize LangSmith client, tracing to {local_path}: {e}")
+        self._queue: "queue.Queue[List[Dict[str, Any]]]" = queue.Queue(maxsize=queue_size)
+        self._worker = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._worker.start()
+        atexit.register(self.flush)
+        target = f"LangSmith project {project}" if self.client else local_path
+        print(f"Tracing to {target} (sample rate {sample_rate})")
+
+    def start_trace(self, name: str, inputs: Dict[str, Any]) -> Trace:
+        """Begin tracing a request; the sampling decision is made here and applied at finish()."""
+        sampled = random.random() < self.sample_rate
+        metrics.inc("traces_total", sampled=sampled)
+        return Trace(self, name, inputs, sampled)
+
+    def enqueue(self, spans: List[Dict[str, Any]]):
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            metrics.inc("trace_dropped_total")
+
+    def flush(self, timeout: float = 5.0):
+        """Wait (bounded) until queued traces have been exported."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._export([span for spans in batch for span in self._prepare(spans)])
+            except Exception as e:
+                print(f"Trace export failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _prepare(self, spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add the trace id and dotted order LangSmith uses to nest spans."""
+        by_id = {span["id"]: span for span in spans}
+        trace_id = spans[0]["id"]
+
+        def dotted_order(span):
+            if "dotted_order" not in span:
+                own = f"{span['start_time']:%Y%m%dT%H%M%S%fZ}{span['id']}"
+                parent = by_id.get(span["parent_run_id"])
+                span["dotted_order"] = f"{dotted_order(parent)}.{own}" if parent else own
+            return span["dotted_order"]
+
+        for span in spans:
+            span["inputs"] = _as_dict(span["inputs"], "input")
+            if "outputs" in span:
+                span["outputs"] = _as_dict(span["outputs"], "output")
+            span.setdefault("end_time", _now())
+            span["trace_id"] = trace_id
+            span["session_name"] = self.project
+            dotted_order(span)
+        return spans
+
+    def _export(self, runs: List[Dict[str, Any]]):
+        if self.client is not None:
+            try:
+                self.client.batch_ingest_runs(create=runs)
+                metrics.inc("trace_spans_exported_total", len(runs), target="langsmith")
+                return
+            except Exception as e:
+                print(f"LangSmith export failed, writing traces to {self.local_path}: {e}")
+        directory = os.path.dirname(os.path.abspath(self.local_path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.local_path, "a") as f:
+            for run in runs:
+                f.write(json.dumps(run, default=str) + "\n")
+        metrics.inc("trace_spans_exported_total", len(runs), target="jsonl")
+
+
+_pipeline: Optional[TracingPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_tracer() -> Optional[TracingPipeline]:
+    """Return the process-wide tracing pipeline, creating it on first use, or None if tracing is off."""
+    global _pipeline
+    if not config.langchain_tracing_v2:
+        return None
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = TracingPipeline(
+                sample_rate=config.trace_sample_rate,
+                queue_size=config.trace_queue_size,
+                batch_size=config.trace_batch_size,
+                flush_interval=config.trace_flush_interval,
+                project=config.langchain_project,
+                local_path=config.trace_local_path,
+                api_key=config.langchain_api_key,
+            )
+        return _pipeline
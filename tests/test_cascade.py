@@ -0,0 +1,116 @@
+import os
+import threading
+
+# The fake generators never call OpenAI, but config requires a key to be present
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src.cascade import ModelCascade
+from src.langgraph_workflow import LangGraphCodeAssistant
+from src.models import CodeSolution
+from src.shared_cache import SQLiteCache
+from src.code_generator import RUNTIME_ERROR
+
+
+class FakeGenerator:
+    """Generator whose solutions pass or fail depending on its model."""
+
+    passing_models = {"strong"}
+
+    def __init__(self, model: str):
+        self.model = model
+        self.calls = 0
+
+    def generate_code(self, context, messages):
+        self.calls += 1
+        outcome = "pass" if self.model in self.passing_models else "fail"
+        # Vary the code so retries are not treated as repeats
+        return CodeSolution(prefix=self.model, imports="", code=f"{outcome} {self.calls}")
+
+    def check_imports(self, imports):
+        return True, ""
+
+    def check_execution(self, imports, code):
+        if code.startswith("pass"):
+            return True, ""
+        return False, "ValueError: wrong answer"
+
+
+def make_assistant(cascade):
+    generators = {}
+
+    def factory(model):
+        generators[model] = FakeGenerator(model)
+        return generators[model]
+
+    assistant = LangGraphCodeAssistant("docs", cascade=cascade, generator_factory=factory)
+    return assistant, generators
+
+
+def test_escalates_after_repeated_failures():
+    assistant, generators = make_assistant(ModelCascade(["cheap", "strong"], escalate_after=2))
+
+    result = assistant.generate_solution("question", max_iterations=5)
+
+    assert result["error"] == "no"
+    assert result["solved_by"] == "strong"
+    assert generators["cheap"].calls == 2
+    assert generators["strong"].calls == 1
+
+
+def test_cheap_model_solves_without_escalating(monkeypatch):
+    monkeypatch.setattr(FakeGenerator, "passing_models", {"cheap", "strong"})
+    assistant, generators = make_assistant(ModelCascade(["cheap", "strong"], escalate_after=2))
+
+    result = assistant.generate_solution("question", max_iterations=5)
+
+    assert result["solved_by"] == "cheap"
+    assert generators["strong"].calls == 0
+
+
+def test_learned_statistics_persist_and_escalate_early(tmp_path):
+    stats = SQLiteCache(str(tmp_path / "stats.sqlite"), namespace="cascade")
+    cascade = ModelCascade(["cheap", "strong"], escalate_after=3, stats=stats, min_samples=2)
+    for _ in range(2):
+        cascade.record_outcome([[0, RUNTIME_ERROR], [0, RUNTIME_ERROR], [1, ""]], solved=True)
+
+    # A new cascade, e.g. after the assistant was recreated, reads what was learned
+    fresh = ModelCascade(["cheap", "strong"], escalate_after=3, explore_rate=0,
+                         stats=SQLiteCache(str(tmp_path / "stats.sqlite"), namespace="cascade"), min_samples=2)
+
+    assert fresh.next_tier(0, 1, RUNTIME_ERROR, no_progress=False) == 1
+    assert ModelCascade(["cheap", "strong"], escalate_after=3).next_tier(0, 1, RUNTIME_ERROR, False) == 0
+
+
+def test_learned_escalation_is_still_explored_and_can_be_unlearned():
+    cascade = ModelCascade(["cheap", "strong"], escalate_after=3, min_samples=2, explore_rate=1)
+    for _ in range(2):
+        cascade.record_outcome([[0, RUNTIME_ERROR], [1, ""]], solved=True)
+        cascade.record_outcome([[0, RUNTIME_ERROR], [0, RUNTIME_ERROR], [1, ""]], solved=True)
+
+    # Retries never recovered, but exploration keeps retrying on the tier
+    assert cascade.next_tier(0, 1, RUNTIME_ERROR, no_progress=False) == 0
+
+    # After an upgrade, the explored retries recover and the escalation is unlearned
+    for _ in range(10):
+        cascade.record_outcome([[0, RUNTIME_ERROR], [0, ""]], solved=True)
+    cascade.explore_rate = 0
+    assert cascade.next_tier(0, 1, RUNTIME_ERROR, no_progress=False) == 0
+
+
+def test_statistics_from_concurrent_writers_are_not_lost(tmp_path):
+    path = str(tmp_path / "stats.sqlite")
+    # Separate instances stand in for separate worker processes
+    cascades = [ModelCascade(["cheap", "strong"], stats=SQLiteCache(path, namespace="cascade")) for _ in range(4)]
+
+    def record(cascade):
+        for _ in range(25):
+            cascade.record_outcome([[0, RUNTIME_ERROR], [0, ""]], solved=True)
+
+    threads = [threading.Thread(target=record, args=(cascade,)) for cascade in cascades]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = SQLiteCache(path, namespace="cascade").get(f"cheap:{RUNTIME_ERROR}")
+    assert stats == {"retries": 100, "recovered": 100}
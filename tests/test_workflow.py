@@ -0,0 +1,67 @@
+import os
+
+# The fake generators never call OpenAI, but config requires a key to be present
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src.langgraph_workflow import LangGraphCodeAssistant
+from src.models import CodeSolution
+
+
+class RepeatingGenerator:
+    """Generator that returns the same failing solution every time."""
+
+    def __init__(self, model: str, import_error: bool = False):
+        self.model = model
+        self.import_error = import_error
+        self.calls = 0
+
+    def generate_code(self, context, messages):
+        self.calls += 1
+        imports = f"import fixed_{self.calls}" if self.import_error else "import os"
+        return CodeSolution(prefix="same", imports=imports, code=f"print({self.calls})" if self.import_error else "1 / 0")
+
+    def check_imports(self, imports):
+        if self.import_error and self.calls == 1:
+            return False, "ModuleNotFoundError: No module named 'missing'"
+        return True, ""
+
+    def check_execution(self, imports, code):
+        return False, "ZeroDivisionError: division by zero"
+
+
+def make_assistant(reflection_mode, **kwargs):
+    generator = RepeatingGenerator("model", **kwargs)
+    assistant = LangGraphCodeAssistant("docs", generator_factory=lambda model: generator)
+    assistant.reflection_mode = reflection_mode
+    return assistant, generator
+
+
+def messages_sent(result):
+    return [text for role, text in result["messages"] if role == "user"]
+
+
+def test_repeated_failure_switches_approach_before_stopping():
+    assistant, generator = make_assistant("reflect")
+
+    result = assistant.generate_solution("question", max_iterations=10)
+
+    assert any("Take a different approach" in text for text in messages_sent(result))
+    assert generator.calls == 3
+
+
+def test_repeated_failure_without_reflection_mode_also_switches_approach():
+    assistant, generator = make_assistant("do_not_reflect")
+
+    result = assistant.generate_solution("question", max_iterations=10)
+
+    assert any("Take a different approach" in text for text in messages_sent(result))
+    assert generator.calls == 3
+
+
+def test_import_fix_keeps_the_previous_code():
+    assistant, generator = make_assistant("do_not_reflect", import_error=True)
+
+    result = assistant.generate_solution("question", max_iterations=2)
+
+    assert result["generation"].imports == "import fixed_2"
+    assert result["generation"].code == "print(1)"